@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the event tracker
+Runs offline against synthetic events pages, no network access needed
+"""
+
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from datetime import datetime
+
+from event_tracker import OmSwamiEventTracker, PARSER_BACKENDS, decoded_chunks
+from page_generator import generate_events_page
+from replay_server import ReplayServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+# Committed pipeline results that every pipeline run is compared against
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'baseline.json')
+
+
+def time_call(func, repeat):
+    """Return the best wall-clock time of `repeat` calls to func"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_parse_scaling(tracker, sizes, repeat):
+    """Time parse_events on growing pages and report the cost per event card
+    
+    The cost per card should stay flat as the page grows. Pages where half the
+    cards have no calendar icon are included because that is where a forward
+    search for the next icon from every title turns quadratic.
+    """
+    print(f"{'cards':>8} {'undated':>8} {'parse (s)':>12} {'per card (us)':>15}")
+    for size in sizes:
+        for missing_icons in (0, 0.5):
+            page = generate_events_page(size, missing_icons=missing_icons)
+            content = page.html
+            undated = sum(event['quirk'] == 'missing_icon' for event in page.events)
+            elapsed = time_call(lambda: tracker.parse_events(content), repeat)
+            print(f"{size:>8} {undated:>8} {elapsed:>12.4f} {elapsed / size * 1e6:>15.1f}")
+
+
+def comparable(events):
+    """Strip the fields that legitimately differ between two parses"""
+    return [{key: value for key, value in event.items() if key != 'discovered_at'}
+            for event in events]
+
+
+def bench_backends(tracker, sizes, repeat):
+    """Check that every parser backend extracts identical events, then time them
+    
+    Returns False if any backend disagrees with html.parser.
+    """
+    pages = [(os.path.basename(path), open(path, 'rb').read())
+             for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))]
+    pages += [(f"synthetic-{size}", generate_events_page(size, missing_icons=0.25, parent_sibling_dates=0.2,
+                                                         noisy_dates=0.1).html)
+              for size in sizes]
+
+    identical = True
+    print(f"{'page':<24} " + ' '.join(f"{backend:>14}" for backend in PARSER_BACKENDS))
+    for name, content in pages:
+        timings = []
+        reference = None
+        for backend in PARSER_BACKENDS:
+            tracker.parser_backend = backend
+            events = comparable(tracker.parse_events(content))
+            if reference is None:
+                reference = events
+            elif events != reference:
+                identical = False
+                print(f"MISMATCH: {backend} differs from {PARSER_BACKENDS[0]} on {name}")
+            timings.append(time_call(lambda: tracker.parse_events(content), repeat))
+        print(f"{name:<24} " + ' '.join(f"{elapsed * 1000:>12.2f}ms" for elapsed in timings))
+    return identical
+
+
+def bench_parse_scope(tracker, sizes, repeat):
+    """Compare a full parse with a parse restricted to the events container
+    
+    Peak memory is measured with tracemalloc, which sees the BeautifulSoup tree
+    but not lxml's C-level document, so the bytes handed to the parser are
+    reported as well.
+    """
+    scope = {'tag': 'div', 'class': 'events'}
+    print(f"{'page':<16} {'backend':<12} {'scope':<7} {'parsed KB':>10} {'parse (ms)':>11} {'peak KB':>9}")
+    for size in sizes:
+        content = generate_events_page(size, gallery_images=size * 4).html
+        for backend in PARSER_BACKENDS:
+            tracker.parser_backend = backend
+            for label, parse_scope in (('full', None), ('events', scope)):
+                tracker.config['parse_scope'] = parse_scope
+                tracker.parse_scope = tracker.compile_parse_scope()
+                parsed = tracker.restrict_to_scope(content) if parse_scope else content
+                
+                elapsed = time_call(lambda: tracker.parse_events(content), repeat)
+                tracemalloc.start()
+                tracker.parse_events(content)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{'cards-' + str(size):<16} {backend:<12} {label:<7} {len(parsed) / 1024:>10.0f} "
+                      f"{elapsed * 1000:>11.1f} {peak / 1024:>9.0f}")
+
+
+def measure_in_child(func, *args):
+    """Run func in a fresh process, return (result, peak RSS growth in KB)"""
+    def child(queue):
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result = func(*args)
+        queue.put((result, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before))
+
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=child, args=(queue,))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def time_full_parse(tracker, content):
+    start = time.perf_counter()
+    tracker.parse_events(content)
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+def time_streaming_parse(tracker, content, chunk_size=16384):
+    chunks = (content[i:i + chunk_size] for i in range(0, len(content), chunk_size))
+    start = time.perf_counter()
+    first_event = None
+    for _ in tracker.stream_events(chunks):
+        if first_event is None:
+            first_event = time.perf_counter() - start
+    return first_event, time.perf_counter() - start
+
+
+def bench_streaming(tracker, sizes):
+    """Compare time to first event, total time and peak memory of full and streaming parses"""
+    print(f"{'page':<14} {'mode':<22} {'first event (ms)':>17} {'total (ms)':>11} {'peak RSS KB':>12}")
+    for size in sizes:
+        content = generate_events_page(size, gallery_images=size * 4).html
+        modes = [('full parse', time_full_parse, {}),
+                 ('streaming', time_streaming_parse, {}),
+                 ('streaming + stop_after', time_streaming_parse,
+                  {'stop_after': {'tag': 'div', 'class': 'events'}})]
+        for label, func, streaming_config in modes:
+            tracker.config['streaming'] = streaming_config
+            (first_event, total), peak = measure_in_child(func, tracker, content)
+            print(f"{'cards-' + str(size):<14} {label:<22} {first_event * 1000:>17.1f} "
+                  f"{total * 1000:>11.1f} {peak:>12}")
+
+
+def bench_pipeline_scale(tracker, sizes, repeat):
+    """Time fetch_events over the local replay server and find_new_events as the page grows
+    
+    The pages carry every layout quirk; the extracted titles and dates are
+    checked against what the generator put on the page. Returns False if
+    they differ.
+    """
+    correct = True
+    tracker.parse_cache = None
+    print(f"{'cards':>8} {'page KB':>9} {'fetch (ms)':>11} {'per card (us)':>14} {'diff (ms)':>10}")
+    for size in sizes:
+        page = generate_events_page(size, missing_icons=0.1, parent_sibling_dates=0.2, noisy_dates=0.1)
+        expected = [(event['title'], event['date']) for event in page.events]
+        with ReplayServer({'/events': [{'status': 200, 'body': page.html}]}) as server:
+            tracker.url = server.base_url + '/events'
+            events = tracker.fetch_events()
+            if [(event['title'], event['date']) for event in events] != expected:
+                correct = False
+                print(f"MISMATCH: events extracted from the {size} card page differ from the generated ones")
+            fetch = time_call(tracker.fetch_events, repeat)
+        
+        # One event in a hundred is new since the previous check
+        previous = events[:size - max(size // 100, 1)]
+        diff = time_call(lambda: tracker.find_new_events(events, previous), repeat)
+        print(f"{size:>8} {len(page.html) / 1024:>9.0f} {fetch * 1000:>11.1f} "
+              f"{fetch / size * 1e6:>14.1f} {diff * 1000:>10.2f}")
+    return correct
+
+
+PIPELINE_STAGES = ('fetch', 'parse', 'diff', 'save', 'email')
+
+
+def percentile(sorted_values, fraction):
+    """Linearly interpolated percentile of an already sorted list"""
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(timings):
+    """Summary statistics of a list of timings in seconds, reported in milliseconds"""
+    timings = sorted(timings)
+    return {
+        'runs': len(timings),
+        'min_ms': timings[0] * 1000,
+        'mean_ms': sum(timings) / len(timings) * 1000,
+        'p50_ms': percentile(timings, 0.5) * 1000,
+        'p90_ms': percentile(timings, 0.9) * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+        'max_ms': timings[-1] * 1000
+    }
+
+
+def time_runs(func, runs):
+    """Return the wall-clock time of each of `runs` calls to func"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_pipeline(tracker, sizes, runs, workdir):
+    """Time every stage of check_for_new_events on generated pages of each size
+    
+    fetch is the HTTP request and the decoded body download from the local
+    replay server, parse is parse_events, diff is diff_events with one
+    event in a hundred new and one in a hundred modified, save is save_events and email is render_email for
+    the new events. Returns {size: {stage: summary}}.
+    """
+    tracker.parse_cache = None
+    tracker.events_file = os.path.join(workdir, 'events_data.json')
+    results = {}
+    for size in sizes:
+        page = generate_events_page(size, missing_icons=0.1, parent_sibling_dates=0.2, noisy_dates=0.1)
+        with ReplayServer({'/events': [{'status': 200, 'body': page.html}]}) as server:
+            tracker.url = server.base_url + '/events'
+            
+            def fetch():
+                with tracker.get_with_retries({}) as response:
+                    return b''.join(decoded_chunks(response, 16384, {'wire_bytes': 0, 'decoded_bytes': 0}))
+            
+            content = fetch()
+            timings = {'fetch': time_runs(fetch, runs)}
+        
+        events = tracker.parse_events(content)
+        previous = [dict(event, date='1 January') if i % 100 == 0 else event
+                    for i, event in enumerate(events[:size - max(size // 100, 1)])]
+        new_events = tracker.diff_events(events, previous)['new']
+        timings['parse'] = time_runs(lambda: tracker.parse_events(content), runs)
+        timings['diff'] = time_runs(lambda: tracker.diff_events(events, previous), runs)
+        timings['save'] = time_runs(lambda: tracker.save_events(events), runs)
+        timings['email'] = time_runs(lambda: tracker.render_email(new_events).as_string(), runs)
+        results[str(size)] = {stage: summarize(timings[stage]) for stage in PIPELINE_STAGES}
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold, min_regression_ms):
+    """Print each stage's median against the baseline, return the regressions found
+    
+    A stage regresses when its median is more than `threshold` (a fraction)
+    and more than `min_regression_ms` slower than the baseline's; the
+    absolute floor keeps sub-millisecond noise from failing the run.
+    """
+    regressions = []
+    if baseline.get('machine') != platform.platform():
+        print(f"\nNote: the baseline was recorded on {baseline.get('machine', 'another machine')}, "
+              f"timings may not be comparable")
+    print(f"\n{'cards':>8} {'stage':<7} {'baseline p50':>13} {'p50':>10} {'change':>8}")
+    for size, stages in results.items():
+        for stage, summary in stages.items():
+            reference = baseline['results'].get(size, {}).get(stage)
+            if not reference:
+                continue
+            before, after = reference['p50_ms'], summary['p50_ms']
+            change = after / before - 1 if before else 0
+            regressed = change > threshold and after - before > min_regression_ms
+            if regressed:
+                regressions.append((size, stage, before, after))
+            print(f"{size:>8} {stage:<7} {before:>11.2f}ms {after:>8.2f}ms {change:>+8.0%}"
+                  f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Event tracker benchmarks')
+    parser.add_argument('--config', default='config.json',
+                       help='Path to config file (default: config.json)')
+    parser.add_argument('--repeat', type=int, default=3,
+                       help='Runs per measurement, the best time is reported (default: 3)')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    scaling = subparsers.add_parser('scaling', help='Parse time per event card as the page grows')
+    scaling.add_argument('--sizes', default='250,500,1000,2000,4000',
+                        help='Comma separated event card counts (default: 250,500,1000,2000,4000)')
+
+    backends = subparsers.add_parser('backends',
+                                     help='Compare parser backends on the fixtures and synthetic pages')
+    backends.add_argument('--sizes', default='100,1000',
+                         help='Comma separated synthetic page sizes (default: 100,1000)')
+
+    scope = subparsers.add_parser('scope', help='Full parse versus a parse restricted to the events container')
+    scope.add_argument('--sizes', default='50,500',
+                      help='Comma separated synthetic page sizes (default: 50,500)')
+
+    streaming = subparsers.add_parser('streaming', help='Full parse versus incremental streaming parse')
+    streaming.add_argument('--sizes', default='100,2000',
+                          help='Comma separated synthetic page sizes (default: 100,2000)')
+
+    scale = subparsers.add_parser('scale',
+                                  help='fetch_events and find_new_events on generated pages of growing size')
+    scale.add_argument('--sizes', default='10,100,1000,10000,100000',
+                      help='Comma separated event card counts (default: 10,100,1000,10000,100000)')
+
+    pipeline = subparsers.add_parser('pipeline', help='Time each stage of a check, with percentiles, as JSON')
+    pipeline.add_argument('--sizes', default='10,100,1000,10000',
+                         help='Comma separated event card counts (default: 10,100,1000,10000)')
+    pipeline.add_argument('--runs', type=int, default=20,
+                         help='Timed runs per stage and size (default: 20)')
+    pipeline.add_argument('--output', default='benchmark_results.json',
+                         help='Where to write the results (default: benchmark_results.json)')
+    pipeline.add_argument('--baseline', default=BASELINE_FILE,
+                         help='Results file to compare against, exits 1 on a regression; an empty value '
+                              'skips the comparison (default: benchmarks/baseline.json)')
+    pipeline.add_argument('--threshold', type=float, default=0.25,
+                         help='Allowed slowdown of a stage median as a fraction (default: 0.25)')
+    pipeline.add_argument('--min-regression-ms', type=float, default=1.0,
+                         help='Slowdowns smaller than this many ms never count (default: 1.0)')
+
+    args = parser.parse_args()
+
+    # Per-event log lines would dominate the timings
+    logging.getLogger().setLevel(logging.ERROR)
+
+    tracker = OmSwamiEventTracker(config_file=args.config)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    if args.benchmark == 'scaling':
+        bench_parse_scaling(tracker, sizes, args.repeat)
+    elif args.benchmark == 'backends':
+        if not bench_backends(tracker, sizes, args.repeat):
+            sys.exit(1)
+    elif args.benchmark == 'scope':
+        bench_parse_scope(tracker, sizes, args.repeat)
+    elif args.benchmark == 'streaming':
+        bench_streaming(tracker, sizes)
+    elif args.benchmark == 'scale':
+        with tempfile.TemporaryDirectory() as workdir:
+            # No saved events, so every fetch parses the page
+            tracker.events_file = os.path.join(workdir, 'events_data.json')
+            if not bench_pipeline_scale(tracker, sizes, args.repeat):
+                sys.exit(1)
+    elif args.benchmark == 'pipeline':
+        with tempfile.TemporaryDirectory() as workdir:
+            results = bench_pipeline(tracker, sizes, args.runs, workdir)
+        
+        print(f"{'cards':>8} {'stage':<7} {'p50 (ms)':>10} {'p90 (ms)':>10} {'p99 (ms)':>10}")
+        for size, stages in results.items():
+            for stage, summary in stages.items():
+                print(f"{size:>8} {stage:<7} {summary['p50_ms']:>10.2f} {summary['p90_ms']:>10.2f} "
+                      f"{summary['p99_ms']:>10.2f}")
+        
+        with open(args.output, 'w') as f:
+            json.dump({'created_at': datetime.now().isoformat(), 'machine': platform.platform(),
+                       'python': platform.python_version(), 'parser': tracker.parser_backend,
+                       'runs': args.runs, 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+        
+        if args.baseline and os.path.abspath(args.baseline) == os.path.abspath(args.output):
+            print("\nBaseline rewritten, nothing to compare")
+        elif args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            regressions = compare_to_baseline(results, baseline, args.threshold, args.min_regression_ms)
+            if regressions:
+                print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}")
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,51 @@ Om Swami Events Tracker
 Monitors https://omswami.org/events for new events and sends email notifications
 """
 
+import asyncio
+import collections
+import contextlib
 import requests
-from bs4 import BeautifulSoup, NavigableString
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
 import json
 import os
 import smtplib
+import sqlite3
+import email.utils
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime
+from datetime import datetime, timedelta
 import hashlib
+import http.server
+import random
+import re
+import threading
 import time
+import zlib
 import logging
 
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:  # Optional, only needed for the lxml parser backends
+    lxml = None
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows, where parse cache counters are only locked within a process
+    fcntl = None
+
+try:
+    import brotli
+except ImportError:  # Optional, without it brotli is simply not offered to the server
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -26,14 +59,1273 @@ logging.basicConfig(
     ]
 )
 
+# Parts of the page that change on every request even when the events do not.
+# They are blanked out before hashing the body for the unchanged-page check.
+VOLATILE_PATTERNS = [
+    (re.compile(rb'\snonce="[^"]*"'), b''),
+    (re.compile(rb'<meta[^>]+name="csrf[^"]*"[^>]*>', re.IGNORECASE), b''),
+    (re.compile(rb'<input[^>]+name="(?:_?csrf[^"]*|_token|_wpnonce|authenticity_token)"[^>]*>',
+                re.IGNORECASE), b''),
+    (re.compile(rb'([?&](?:ver|v|_|t|ts|cb)=)[\w.-]+'), rb'\1'),
+]
+
+
+# Parser backends selectable with the "parser" config key:
+#   html.parser - BeautifulSoup with Python's built-in parser (no extra dependencies)
+#   lxml        - BeautifulSoup on top of the lxml parser
+#   lxml-native - lxml.html directly, no BeautifulSoup tree at all
+PARSER_BACKENDS = ('html.parser', 'lxml', 'lxml-native')
+DEFAULT_PARSER = 'lxml-native'
+
+
+# Declarative description of where events live on the page. A custom
+# "extraction_rules" config section is merged over these defaults, so only the
+# parts that differ need to be given.
+DEFAULT_EXTRACTION_RULES = {
+    # Every title heading starts an event, except the listed non-event headings
+    "title": {
+        "tag": "h3",
+        "skip": ["Event Gallery", "Download Pics"]
+    },
+    # The date is the first long enough text after the calendar icon. Sources
+    # are tried in order; "when": "no_siblings" only runs a source if the icon
+    # has no following siblings at all.
+    "date": {
+        "icon": {"tag": "img", "attrs": {"alt": "Event Date"}},
+        "sources": [
+            {"from": "icon_siblings", "max_siblings": 12, "min_length": 4,
+             "skip_prefixes": ["Event Details"]},
+            {"from": "parent_siblings", "when": "no_siblings", "max_siblings": 12, "min_length": 4}
+        ],
+        "default": "Date not specified"
+    },
+    # The description is built from the first paragraphs of the title's parent
+    "description": {
+        "tag": "p",
+        "max_paragraphs": 2,
+        "max_length": 500,
+        "default": "No description available"
+    },
+    # Each card links to its detail page, which the optional enrichment stage
+    # reads for the full description, venue and registration status
+    "details": {
+        "link": {"tag": "a", "text": "Event Details"},
+        "content": {"tag": "p", "container": None, "max_length": 5000},
+        "venue_labels": ["Venue", "Location", "Place"],
+        # Phrases are matched case-insensitively, "closed" ones first
+        "registration": {
+            "closed": ["registrations closed", "registration closed", "registrations are closed",
+                       "sold out", "fully booked"],
+            "open": ["register now", "registrations are open", "registration is open",
+                     "book now", "apply now"]
+        }
+    }
+}
+
+# Elements whose text may hold a "Venue: ..." line on a detail page
+VENUE_BLOCK_TAGS = ('p', 'li', 'dt', 'dd', 'td', 'th', 'div', 'span', 'strong', 'b', 'h4', 'h5', 'h6')
+
+DATE_SOURCES = ('icon_siblings', 'parent_siblings')
+
+
+def merge_rules(defaults, overrides):
+    """Recursively merge configured rule overrides over the defaults"""
+    merged = dict(defaults)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(defaults.get(key), dict):
+            merged[key] = merge_rules(defaults[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class DateSource:
+    """One compiled place to look for the event date"""
+    
+    def __init__(self, rule):
+        self.origin = rule['from']
+        if self.origin not in DATE_SOURCES:
+            raise ValueError(f"unknown date source '{self.origin}', expected one of {', '.join(DATE_SOURCES)}")
+        self.only_without_siblings = rule.get('when') == 'no_siblings'
+        self.max_siblings = int(rule.get('max_siblings', 12))
+        self.min_length = int(rule.get('min_length', 4))
+        # str.startswith takes a tuple, so the whole skip list is one C call
+        self.skip_prefixes = tuple(rule.get('skip_prefixes', ()))
+
+
+class ExtractionRules:
+    """Extraction rules compiled once at startup into the lookups the parsers use"""
+    
+    def __init__(self, overrides=None):
+        rules = merge_rules(DEFAULT_EXTRACTION_RULES, overrides or {})
+        
+        self.title_tag = rules['title']['tag']
+        self.skip_titles = frozenset(rules['title'].get('skip', ()))
+        
+        date_rules = rules['date']
+        self.icon_tag = date_rules['icon']['tag']
+        self.icon_attrs = tuple(date_rules['icon'].get('attrs', {}).items())
+        self.date_sources = tuple(DateSource(source) for source in date_rules['sources'])
+        self.default_date = date_rules['default']
+        
+        description_rules = rules['description']
+        self.description_tag = description_rules['tag']
+        self.max_paragraphs = int(description_rules['max_paragraphs'])
+        self.max_description_length = int(description_rules['max_length'])
+        self.default_description = description_rules['default']
+        
+        details_rules = rules['details']
+        self.details_link_tag = details_rules['link']['tag']
+        self.details_link_text = details_rules['link']['text']
+        self.details_content = details_rules['content']
+        self.venue_pattern = re.compile(
+            r'^(?:' + '|'.join(re.escape(label) for label in details_rules['venue_labels']) + r')\s*[:\-–]?\s*(.*)$',
+            re.IGNORECASE | re.DOTALL)
+        self.registration_phrases = [
+            (status, tuple(phrase.lower() for phrase in details_rules['registration'].get(status, ())))
+            for status in ('closed', 'open')
+        ]
+        
+        # Identifies the rule set, so results extracted under other rules are not reused
+        self.digest = hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()
+    
+    def is_date_icon(self, tree, element):
+        """Check whether an element with the icon tag carries all the icon attributes"""
+        for name, value in self.icon_attrs:
+            actual = tree.attr(element, name)
+            if name == 'class':
+                if value not in (actual or '').split():
+                    return False
+            elif actual != value:
+                return False
+        return True
+    
+    def matches(self, tree, element, spec):
+        """Check an element against a {tag, class, id} description"""
+        if tree.tag(element) != spec.get('tag', tree.tag(element)):
+            return False
+        if 'class' in spec and spec['class'] not in (tree.attr(element, 'class') or '').split():
+            return False
+        if 'id' in spec and tree.attr(element, 'id') != spec['id']:
+            return False
+        return True
+
+
+class SoupTree:
+    """Tree access used by the event extraction, for BeautifulSoup documents"""
+    
+    @staticmethod
+    def tag(node):
+        return node.name
+    
+    @staticmethod
+    def parent(node):
+        return node.parent
+    
+    @staticmethod
+    def siblings(node):
+        return node.next_siblings
+    
+    @staticmethod
+    def attr(node, name):
+        # Multi-valued attributes such as class come back as lists
+        value = node.get(name)
+        return ' '.join(value) if isinstance(value, list) else value
+    
+    @staticmethod
+    def text(node):
+        return node.get_text(strip=True)
+    
+    @staticmethod
+    def descendants(node, tag, limit):
+        return node.find_all(tag, limit=limit)
+    
+    @staticmethod
+    def spaced_text(node):
+        return node.get_text(' ', strip=True)
+    
+    @staticmethod
+    def iter_tags(node, tags):
+        return node.find_all(list(tags))
+
+
+class LxmlTree:
+    """Tree access used by the event extraction, for lxml.html documents
+    
+    Mirrors what BeautifulSoup returns so both backends extract identical events.
+    """
+    
+    @staticmethod
+    def tag(node):
+        return node.tag
+    
+    @staticmethod
+    def parent(node):
+        return node.getparent()
+    
+    @staticmethod
+    def siblings(node):
+        # BeautifulSoup lists text between elements as separate string siblings,
+        # lxml keeps it in the preceding element's tail
+        if node.tail:
+            yield node.tail
+        for sibling in node.itersiblings():
+            if isinstance(sibling.tag, str):
+                yield sibling
+            else:
+                # Comments count as text nodes in BeautifulSoup
+                yield sibling.text or ''
+            if sibling.tail:
+                yield sibling.tail
+    
+    @staticmethod
+    def attr(node, name):
+        return node.get(name)
+    
+    @staticmethod
+    def text(node):
+        return ''.join(text.strip() for text in VISIBLE_TEXT(node))
+    
+    @staticmethod
+    def descendants(node, tag, limit):
+        found = []
+        for element in node.iter(tag):
+            found.append(element)
+            if len(found) == limit:
+                break
+        return found
+    
+    @staticmethod
+    def spaced_text(node):
+        return ' '.join(text.strip() for text in VISIBLE_TEXT(node) if text.strip())
+    
+    @staticmethod
+    def iter_tags(node, tags):
+        return node.iter(*tags)
+
+
+UTF8_HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8') if lxml else None
+
+# The strings BeautifulSoup's get_text returns: text nodes, but not comments or script and style contents
+VISIBLE_TEXT = lxml.etree.XPath('.//text()[not(ancestor::script or ancestor::style)]') if lxml else None
+
+
+def parse_lxml_document(content):
+    """Parse page bytes with lxml.html, preferring UTF-8 like BeautifulSoup does"""
+    try:
+        content.decode('utf-8')
+    except UnicodeDecodeError:
+        return lxml.html.document_fromstring(content)
+    return lxml.html.document_fromstring(content, parser=UTF8_HTML_PARSER)
+
+
+def element_matches(element, spec):
+    """Check an lxml element against a {tag, class, id} description"""
+    if element.tag != spec.get('tag', element.tag):
+        return False
+    if 'class' in spec and spec['class'] not in (element.get('class') or '').split():
+        return False
+    if 'id' in spec and element.get('id') != spec['id']:
+        return False
+    return True
+
+
+def response_encoding(response):
+    """Charset declared in the Content-Type header, UTF-8 when there is none"""
+    if 'charset=' in response.headers.get('Content-Type', '').lower():
+        return response.encoding
+    return 'utf-8'
+
+
+class ParseCache:
+    """On-disk LRU cache from the hash of a page body to the events extracted from it
+    
+    Entries are JSON files named after the key; a hit refreshes the file's mtime,
+    and the least recently used entries are evicted once the cache holds more
+    than max_entries files or max_bytes in total. Hit and miss counters are
+    kept across runs in stats.json. Several trackers may share a directory,
+    from threads or processes: the counters are updated under a lock, and a
+    failed write or an entry evicted by someone else only costs a warning,
+    never the parse.
+    """
+    
+    # Shared by every cache in the process; flock on stats.lock covers other processes
+    stats_lock = threading.Lock()
+    
+    def __init__(self, directory, max_entries=64, max_bytes=8 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats_file = os.path.join(directory, 'stats.json')
+        self.lock_file = os.path.join(directory, 'stats.lock')
+        os.makedirs(directory, exist_ok=True)
+        
+        self.hits = self.misses = 0
+        self.total_hits, self.total_misses = self.load_totals()
+    
+    def load_totals(self):
+        """Hits and misses counted in stats.json by every cache on this directory so far"""
+        if not os.path.exists(self.stats_file):
+            return 0, 0
+        try:
+            with open(self.stats_file, 'r') as f:
+                stats = json.load(f)
+            return stats['hits'], stats['misses']
+        except (OSError, json.JSONDecodeError, KeyError):
+            logging.warning("Could not decode parse cache stats, starting from zero")
+            return 0, 0
+    
+    def key(self, content, namespace):
+        """Cache key for a page body parsed under the given rules/url namespace"""
+        digest = hashlib.sha256(namespace.encode())
+        digest.update(content)
+        return digest.hexdigest()
+    
+    def get(self, key):
+        """Return the cached events for key, or None"""
+        path = os.path.join(self.directory, key + '.json')
+        try:
+            with open(path, 'r') as f:
+                events = json.load(f)
+            os.utime(path)  # Mark as recently used
+        except (OSError, json.JSONDecodeError):
+            self.record(hit=False)
+            return None
+        self.record(hit=True)
+        return events
+    
+    def put(self, key, events):
+        """Store events under key, then evict least recently used entries over the limits"""
+        path = os.path.join(self.directory, key + '.json')
+        # Two writers of the same key each rename their own temporary file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(events, f)
+            os.replace(temp_path, path)
+            self.evict()
+        except OSError as e:
+            logging.warning(f"Could not write to the parse cache: {e}")
+    
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json') and entry.name != 'stats.json':
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # Evicted by another cache meanwhile
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+    
+    def record(self, hit):
+        """Count a lookup, adding it to the totals in stats.json under the lock"""
+        self.hits += hit
+        self.misses += not hit
+        try:
+            with self.stats_lock, open(self.lock_file, 'a') as lock:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                hits, misses = self.load_totals()
+                self.total_hits, self.total_misses = hits + hit, misses + (not hit)
+                write_json_atomic(self.stats_file, {'hits': self.total_hits, 'misses': self.total_misses})
+        except OSError as e:
+            logging.warning(f"Could not update the parse cache stats: {e}")
+
+
+class AdaptiveInterval:
+    """Polling interval that tightens around changes and backs off when the page is quiet
+    
+    Right after new events are found the interval drops to the minimum and then
+    grows by backoff_factor per quiet check up to the maximum. The hour of day of
+    every change is counted; hours with at least hot_hour_threshold changes are
+    treated as hot and polled at the minimum interval. The counts are kept in a
+    state file so they survive restarts.
+    """
+    
+    def __init__(self, config, initial_minutes):
+        self.min_minutes = config.get('min_interval_minutes', 2)
+        self.max_minutes = config.get('max_interval_minutes', 60)
+        self.backoff_factor = config.get('backoff_factor', 1.5)
+        self.hot_hour_threshold = config.get('hot_hour_threshold', 2)
+        self.state_file = config.get('state_file', 'polling_state.json')
+        self.interval_minutes = min(max(initial_minutes, self.min_minutes), self.max_minutes)
+        self.change_hours = [0] * 24
+        
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f:
+                    state = json.load(f)
+                self.change_hours = state['change_hours']
+                self.interval_minutes = state['interval_minutes']
+            except (json.JSONDecodeError, KeyError):
+                logging.warning("Could not decode polling state file, starting fresh")
+    
+    def is_hot(self, hour):
+        return self.change_hours[hour] >= self.hot_hour_threshold
+    
+    def minutes_until_hot(self, now):
+        """Minutes from now until the start of the next hot hour, or None"""
+        for offset in range(1, 25):
+            if self.is_hot((now.hour + offset) % 24):
+                return offset * 60 - now.minute - now.second / 60
+        return None
+    
+    def next_interval(self, changed, now=None):
+        """Return the minutes to wait before the next check and explain why"""
+        now = now or datetime.now()
+        if changed:
+            self.change_hours[now.hour] += 1
+            self.interval_minutes = self.min_minutes
+            reason = "change detected"
+        else:
+            self.interval_minutes = min(self.interval_minutes * self.backoff_factor, self.max_minutes)
+            reason = "quiet, backing off"
+        
+        interval = self.interval_minutes
+        if self.is_hot(now.hour):
+            interval = self.min_minutes
+            reason = "hot time of day"
+        else:
+            # Do not sleep through the start of a hot window at the slow rate
+            until_hot = self.minutes_until_hot(now)
+            if until_hot is not None and until_hot < interval:
+                interval = max(until_hot, self.min_minutes)
+                reason = "hot time of day starting"
+        
+        self.save()
+        return interval, reason
+    
+    def save(self):
+        with open(self.state_file, 'w') as f:
+            json.dump({'change_hours': self.change_hours, 'interval_minutes': self.interval_minutes}, f)
+
+
+OVERRUN_POLICIES = ('skip', 'catch_up')
+
+
+class CheckScheduler:
+    """Fixed-cadence scheduling of checks on time.monotonic deadlines
+    
+    Deadlines advance by the interval from the previous deadline, not from when
+    the check finished, so slow fetches or SMTP do not push the schedule later.
+    When a check overruns one or more deadlines, "skip" drops the missed slots
+    and waits for the next one, "catch_up" runs the missed checks back to back.
+    Optional jitter spreads each wake-up by up to +/- jitter_seconds without
+    moving the underlying schedule. Lag is how late each check actually started.
+    """
+    
+    def __init__(self, jitter_seconds=0, overrun_policy='skip'):
+        if overrun_policy not in OVERRUN_POLICIES:
+            logging.warning(f"Unknown overrun policy '{overrun_policy}', using 'skip'")
+            overrun_policy = 'skip'
+        self.jitter_seconds = jitter_seconds
+        self.overrun_policy = overrun_policy
+        self.deadline = time.monotonic()
+        self.target = self.deadline
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.checks = 0
+        self.skipped = 0
+    
+    def start_check(self):
+        """Record how late the check that is starting now is"""
+        self.last_lag = max(time.monotonic() - self.target, 0.0)
+        self.max_lag = max(self.max_lag, self.last_lag)
+        self.total_lag += self.last_lag
+        self.checks += 1
+        return self.last_lag
+    
+    def wait_for_next(self, interval_seconds):
+        """Advance the schedule by one interval and sleep until it is due"""
+        time.sleep(self.advance(interval_seconds))
+    
+    def advance(self, interval_seconds):
+        """Advance the schedule by one interval, return the seconds until it is due"""
+        self.deadline += interval_seconds
+        now = time.monotonic()
+        
+        if now > self.deadline and self.overrun_policy == 'skip':
+            missed = int((now - self.deadline) // interval_seconds) + 1
+            self.deadline += missed * interval_seconds
+            self.skipped += missed
+            logging.warning(f"Check overran the schedule, skipping {missed} missed check(s)")
+        
+        self.target = self.deadline
+        if self.jitter_seconds:
+            self.target += random.uniform(-self.jitter_seconds, self.jitter_seconds)
+        return max(self.target - time.monotonic(), 0)
+    
+    def stats(self):
+        return {
+            'checks': self.checks,
+            'last_lag_seconds': self.last_lag,
+            'max_lag_seconds': self.max_lag,
+            'mean_lag_seconds': self.total_lag / self.checks if self.checks else 0.0,
+            'skipped_checks': self.skipped
+        }
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for failed fetches
+    
+    Attempt n waits a random time up to base_delay * 2**(n-1), capped at
+    max_delay. A Retry-After header raises the wait to at least what the
+    server asked for.
+    """
+    
+    def __init__(self, config):
+        self.max_attempts = config.get('max_attempts', 3)
+        self.base_delay = config.get('base_delay_seconds', 2)
+        self.max_delay = config.get('max_delay_seconds', 60)
+        self.retry_statuses = frozenset(config.get('retry_statuses', [429, 500, 502, 503, 504]))
+    
+    def delay(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.base_delay * 2 ** (attempt - 1), self.max_delay))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return int(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(retry_at.tzinfo)).total_seconds(), 0)
+
+
+class CircuitBreaker:
+    """Stops fetching after repeated failures and probes before resuming
+    
+    closed    - requests flow normally, consecutive failures are counted
+    open      - after failure_threshold failures no requests are made until
+                reset_timeout seconds have passed
+    half_open - one probe request is let through; success closes the
+                breaker, failure opens it again
+    """
+    
+    def __init__(self, failure_threshold=5, reset_timeout=300):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.open_until = 0.0
+    
+    def allow_request(self):
+        if self.state == 'open' and time.monotonic() >= self.open_until:
+            self.state = 'half_open'
+            logging.info("Circuit breaker half-open, sending a probe request")
+        return self.state != 'open'
+    
+    def record_success(self):
+        if self.state != 'closed':
+            logging.info("Circuit breaker closed, the events page is reachable again")
+        self.state = 'closed'
+        self.failures = 0
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            self.open_for(self.reset_timeout)
+    
+    def open_for(self, seconds):
+        if self.state != 'open':
+            logging.warning(f"Circuit breaker open after {self.failures} failure(s), "
+                            f"pausing fetches for {seconds:.0f}s")
+        self.state = 'open'
+        self.open_until = max(self.open_until, time.monotonic() + seconds)
+    
+    def seconds_until_probe(self):
+        return max(self.open_until - time.monotonic(), 0.0)
+
+
+def rebase_url(url, base_url):
+    """Point a URL at another server, keeping its path and query
+    
+    `base_url` may carry a path prefix: https://omswami.org/events rebased on
+    http://127.0.0.1:8000/mirror becomes http://127.0.0.1:8000/mirror/events.
+    """
+    parts = urlsplit(url)
+    return base_url.rstrip('/') + (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+
+
+# Phases of a check timed into the run stats, in the order they run
+RUN_PHASES = ('fetch', 'decode', 'parse', 'dates', 'details', 'diff', 'notify', 'persist')
+
+# Content codings offered to the server, best compression first
+ACCEPT_ENCODING = ('br, ' if brotli else '') + 'gzip, deflate'
+
+
+def content_decoder(encoding):
+    """Incremental (decompress, flush) functions for a Content-Encoding, None if uncompressed"""
+    encoding = (encoding or 'identity').strip().lower()
+    if encoding == 'identity':
+        return None
+    if encoding in ('gzip', 'x-gzip', 'deflate'):
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding != 'deflate' else zlib.MAX_WBITS)
+        return decoder.decompress, decoder.flush
+    if encoding == 'br' and brotli:
+        decoder = brotli.Decompressor()
+        # brotli calls it process(), brotlicffi decompress()
+        return getattr(decoder, 'decompress', None) or decoder.process, None
+    raise requests.exceptions.ContentDecodingError(f"Unsupported Content-Encoding: {encoding}")
+
+
+def decoded_chunks(response, chunk_size, transfer):
+    """Yield a streamed response body decoded chunk by chunk
+    
+    The body is read undecoded so `transfer` can count the bytes that came
+    over the wire ("wire_bytes") as well as the bytes after decompression
+    ("decoded_bytes"), which urllib3 cannot report for chunked responses.
+    The time spent decompressing is added up in "decode_seconds".
+    """
+    decoder = content_decoder(response.headers.get('Content-Encoding'))
+    decompress, flush = decoder or (None, None)
+    transfer['content_encoding'] = response.headers.get('Content-Encoding', 'identity')
+    for chunk in response.raw.stream(chunk_size, decode_content=False):
+        transfer['wire_bytes'] += len(chunk)
+        if decompress:
+            started = time.perf_counter()
+            chunk = decompress(chunk)
+            transfer['decode_seconds'] = transfer.get('decode_seconds', 0) + time.perf_counter() - started
+        if chunk:
+            transfer['decoded_bytes'] += len(chunk)
+            yield chunk
+    if flush:
+        chunk = flush()
+        if chunk:
+            transfer['decoded_bytes'] += len(chunk)
+            yield chunk
+
+
+def format_bytes(count):
+    """Human readable byte count for log lines"""
+    return f"{count / 1024:.1f} KB" if count >= 1024 else f"{count} B"
+
+
+# Upper bounds of the duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Name: (type, help) of every metric, in the order they are exposed
+METRICS = {
+    'event_tracker_check_duration_seconds': ('histogram', 'Duration of a whole check'),
+    'event_tracker_fetch_duration_seconds': ('histogram', 'Time to request and download the events page'),
+    'event_tracker_parse_duration_seconds': ('histogram', 'Time to parse the events page'),
+    'event_tracker_checks_total': ('counter', 'Checks run, by outcome'),
+    'event_tracker_fetch_responses_total': ('counter', 'Responses to events page requests, by HTTP status'),
+    'event_tracker_transfer_bytes_total': ('counter', 'Events page body bytes, on the wire and decoded'),
+    'event_tracker_events_seen': ('gauge', 'Events on the page at the last check that parsed it'),
+    'event_tracker_new_events_total': ('counter', 'New events detected'),
+    'event_tracker_modified_events_total': ('counter', 'Known events whose content changed'),
+    'event_tracker_notifications_total': ('counter', 'Notification emails, by result'),
+    'event_tracker_scheduler_lag_seconds': ('gauge', 'How late the last scheduled check started'),
+    'event_tracker_scheduler_max_lag_seconds': ('gauge', 'Latest start of any scheduled check so far'),
+}
+
+
+def format_labels(labels):
+    """Prometheus label set of (name, value) pairs, with the values escaped"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in labels) + '}'
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """Counters, gauges and histograms of the running tracker in Prometheus text format
+    
+    Updated by the check loop and read by the metrics HTTP thread, so every
+    access goes through one lock.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}      # (name, labels) -> value, for counters and gauges
+        self.histograms = {}  # (name, labels) -> [bucket counts, sum, count]
+        self.httpd = None
+    
+    def inc(self, name, labels=(), amount=1):
+        with self.lock:
+            self.values[name, labels] = self.values.get((name, labels), 0) + amount
+    
+    def set(self, name, labels, value):
+        with self.lock:
+            self.values[name, labels] = value
+    
+    def observe(self, name, labels, value):
+        with self.lock:
+            histogram = self.histograms.setdefault((name, labels), [[0] * len(DURATION_BUCKETS), 0.0, 0])
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+    
+    def observe_run(self, stats):
+        """Fold the record of a finished check into the metrics"""
+        target = (('target', stats['target']),)
+        phases = stats['phases']
+        self.observe('event_tracker_check_duration_seconds', target, stats['duration_ms'] / 1000)
+        if 'fetch' in phases:
+            self.observe('event_tracker_fetch_duration_seconds', target, phases['fetch'] / 1000)
+        if 'parse' in phases:
+            self.observe('event_tracker_parse_duration_seconds', target, phases['parse'] / 1000)
+        self.inc('event_tracker_checks_total', target + (('outcome', stats['outcome'] or 'error'),))
+        if stats['status']:
+            self.inc('event_tracker_fetch_responses_total', target + (('status', str(stats['status'])),))
+        for kind in ('wire', 'decoded'):
+            self.inc('event_tracker_transfer_bytes_total', target + (('kind', kind),),
+                     stats['page'][f'{kind}_bytes'])
+        if stats['events']['fetched']:
+            self.set('event_tracker_events_seen', target, stats['events']['fetched'])
+        self.inc('event_tracker_new_events_total', target, stats['events']['new'])
+        self.inc('event_tracker_modified_events_total', target, stats['events']['modified'])
+        if stats['notification']:
+            self.inc('event_tracker_notifications_total', target + (('result', stats['notification']),))
+    
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for name, (kind, help_text) in METRICS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, labels), value in sorted(self.values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{format_labels(labels)} {value}")
+                for (metric, labels), (buckets, total, count) in sorted(self.histograms.items()):
+                    if metric == name:
+                        for bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+                            lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {bucket_count}")
+                        lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+                        lines.append(f"{name}_sum{format_labels(labels)} {total}")
+                        lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+    
+    def serve(self, host, port):
+        """Serve /metrics from a background thread, the check loop never waits on it"""
+        metrics = self
+        
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                logging.debug(f"Metrics endpoint: {format % args}")
+        
+        self.httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, name='metrics', daemon=True).start()
+        logging.info(f"Serving metrics on http://{host}:{self.httpd.server_port}/metrics")
+    
+    def close(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+STORAGE_BACKENDS = ('json', 'sqlite', 'journal')
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a temporary file and rename it over path, so readers never see half a file"""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+
+# Bookkeeping fields that are not part of what an event says
+FINGERPRINT_IGNORED_FIELDS = ('id', 'discovered_at', 'removed_at', 'url', 'details_url')
+
+# Fields named in "modified" notifications, in the order they are shown
+NOTIFIED_FIELDS = (('date', 'Date'), ('description', 'Description'), ('venue', 'Venue'),
+                   ('registration_status', 'Registration'), ('full_description', 'Details'))
+
+
+def normalize_field(value):
+    """A field value with whitespace differences removed"""
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    if isinstance(value, list):
+        return [normalize_field(item) for item in value]
+    return value
+
+
+def event_fingerprint(event):
+    """Hash of an event's normalized content fields, equal as long as the event reads the same"""
+    fields = {key: normalize_field(value) for key, value in event.items()
+              if key not in FINGERPRINT_IGNORED_FIELDS}
+    return hashlib.md5(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def changed_fields(previous, current):
+    """The notified fields whose normalized value differs between two versions of an event"""
+    return [(field, label) for field, label in NOTIFIED_FIELDS
+            if normalize_field(previous.get(field)) != normalize_field(current.get(field))]
+
+
+def prune_tombstones(tombstones, now, max_age_days, max_entries):
+    """Drop the oldest removed events beyond the retention limits
+    
+    `tombstones` are in the order the events were removed, so only the
+    entries that actually expire are looked at.
+    """
+    cutoff = (now - timedelta(days=max_age_days)).isoformat()
+    start = 0
+    while start < len(tombstones) and (len(tombstones) - start > max_entries or
+                                       tombstones[start]['removed_at'] < cutoff):
+        start += 1
+    return tombstones[start:]
+
+
+def number_repeated_title(event, occurrences):
+    """Give a repeated title its own id: the second card titled X gets md5(X)-2, the third md5(X)-3
+    
+    `occurrences` counts the ids seen so far on the page. Ids that are
+    already distinct are left alone, so numbering twice changes nothing.
+    """
+    occurrences[event['id']] += 1
+    if occurrences[event['id']] > 1:
+        event['id'] = f"{event['id']}-{occurrences[event['id']]}"
+    return event
+
+
+def event_fields(event):
+    """The fields that describe an event, without when this copy of it was fetched"""
+    return {key: value for key, value in event.items() if key != 'discovered_at'}
+
+
+class SqliteEventStore:
+    """Events of one target in a SQLite database, kept up to date with indexed upserts
+    
+    Every event is a row keyed by (target, id) with its first_seen time;
+    `present` marks the events on the page at the last check. A save only
+    writes the rows that changed: new events, events whose fields changed,
+    and events that left the page, which get their last_seen time. last_seen
+    stays NULL while an event is still on the page, it was last seen at the
+    target's last check (see history()). Events that left the page are the
+    tombstones load() returns with a removed_at; once a save no longer
+    lists a tombstone, its row is deleted. A check that changes nothing
+    only moves the target's last_check forward, see record_check().
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (
+            target TEXT NOT NULL,
+            id TEXT NOT NULL,
+            data TEXT NOT NULL,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT,
+            present INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (target, id)
+        );
+        CREATE INDEX IF NOT EXISTS events_present ON events (target, present);
+        CREATE TABLE IF NOT EXISTS checks (
+            target TEXT PRIMARY KEY,
+            last_check TEXT NOT NULL
+        );
+    """
+    RECORD_CHECK = ('INSERT INTO checks (target, last_check) VALUES (?, ?) '
+                    'ON CONFLICT (target) DO UPDATE SET last_check = excluded.last_check')
+    
+    def __init__(self, path, target):
+        self.path = path
+        self.target = target
+        # Targets are checked from a thread pool, each through its own connection
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(self.SCHEMA)
+    
+    def has_events(self):
+        return self.connection.execute(
+            'SELECT 1 FROM events WHERE target = ? LIMIT 1', (self.target,)).fetchone() is not None
+    
+    def load(self):
+        """The events on the page at the last check, then the tombstones of removed events oldest first
+        
+        discovered_at is when each event was first seen, removed_at when a removed one was last seen.
+        """
+        rows = self.connection.execute(
+            'SELECT data, first_seen, last_seen FROM events WHERE target = ? AND present = 1 ORDER BY rowid',
+            (self.target,)).fetchall()
+        rows += self.connection.execute(
+            'SELECT data, first_seen, last_seen FROM events WHERE target = ? AND present = 0 '
+            'ORDER BY last_seen, rowid', (self.target,)).fetchall()
+        return [dict(json.loads(data), discovered_at=first_seen, **({'removed_at': last_seen} if last_seen else {}))
+                for data, first_seen, last_seen in rows]
+    
+    def save(self, events):
+        """Record the events now on the page in one transaction, return the number of rows written
+        
+        Events with a removed_at are tombstones; rows of earlier tombstones missing from events are deleted.
+        """
+        now = datetime.now().isoformat()
+        rows = [(self.target, event['id'],
+                 json.dumps({key: value for key, value in event_fields(event).items() if key != 'removed_at'},
+                            sort_keys=True, ensure_ascii=False),
+                 event.get('discovered_at', now), event.get('removed_at'))
+                for event in events]
+        live_rows = [row[:4] for row in rows if not row[4]]
+        tombstone_rows = [row for row in rows if row[4]]
+        current_ids = {row[1] for row in rows}
+        
+        with self.connection:
+            written = self.connection.total_changes
+            last_check = self.connection.execute(
+                'SELECT last_check FROM checks WHERE target = ?', (self.target,)).fetchone()
+            stored = dict(self.connection.execute(
+                'SELECT id, present FROM events WHERE target = ?', (self.target,)))
+            
+            # Unchanged rows match the WHERE of the upsert's update and are left alone
+            self.connection.executemany("""
+                INSERT INTO events (target, id, data, first_seen) VALUES (?, ?, ?, ?)
+                ON CONFLICT (target, id) DO UPDATE
+                SET data = excluded.data, present = 1, last_seen = NULL
+                WHERE events.data != excluded.data OR events.present = 0
+            """, live_rows)
+            self.connection.executemany("""
+                INSERT INTO events (target, id, data, first_seen, last_seen, present) VALUES (?, ?, ?, ?, ?, 0)
+                ON CONFLICT (target, id) DO UPDATE
+                SET present = 0, last_seen = excluded.last_seen
+                WHERE events.present = 1
+            """, tombstone_rows)
+            self.connection.executemany(
+                'UPDATE events SET present = 0, last_seen = ? WHERE target = ? AND id = ?',
+                [(last_check[0] if last_check else now, self.target, event_id)
+                 for event_id, present in stored.items() if present and event_id not in current_ids])
+            # Tombstones the caller no longer keeps have expired
+            self.connection.executemany(
+                'DELETE FROM events WHERE target = ? AND id = ?',
+                [(self.target, event_id) for event_id, present in stored.items()
+                 if not present and event_id not in current_ids])
+            written = self.connection.total_changes - written
+            self.connection.execute(self.RECORD_CHECK, (self.target, now))
+        return written
+    
+    def record_check(self):
+        """Note a check that found the same events, so their last_seen moves up to it"""
+        with self.connection:
+            self.connection.execute(self.RECORD_CHECK, (self.target, datetime.now().isoformat()))
+    
+    def history(self):
+        """Every event ever seen with its first_seen, last_seen and whether it is still on the page"""
+        rows = self.connection.execute("""
+            SELECT events.data, events.first_seen, COALESCE(events.last_seen, checks.last_check), events.present
+            FROM events LEFT JOIN checks ON checks.target = events.target
+            WHERE events.target = ? ORDER BY events.rowid
+        """, (self.target,))
+        return [dict(json.loads(data), first_seen=first_seen, last_seen=last_seen, present=bool(present))
+                for data, first_seen, last_seen, present in rows]
+    
+    def migrate_from_json(self, json_file):
+        """Import a JSON events file into an empty store, once"""
+        if self.has_events() or not os.path.exists(json_file):
+            return 0
+        with open(json_file, 'r') as f:
+            events = json.load(f)
+        self.save(events)
+        logging.info(f"Migrated {len(events)} events from {json_file} to {self.path}")
+        return len(events)
+    
+    def close(self):
+        self.connection.close()
+
+
+class EventJournal:
+    """Events of one target as an append-only JSONL journal plus a compacted snapshot
+    
+    Each save appends one line per change - {"seq", "op", "id", "at"} with
+    op "add", "change" (both carrying the "event") or "remove" - and fsyncs,
+    so a crash loses at most the line being written. State is rebuilt by
+    replaying the journal over the snapshot. Once `compact_every` entries
+    have piled up since the snapshot, a background thread writes a new
+    snapshot and drops the entries it covers from the journal.
+    """
+    
+    def __init__(self, path, compact_every=1000):
+        self.path = path
+        self.snapshot_path = os.path.splitext(path)[0] + '.snapshot.json'
+        self.compact_every = compact_every
+        self.lock = threading.Lock()
+        self.compaction = None
+        self.events, self.seq, self.snapshot_seq = self.replay()
+    
+    def replay(self):
+        """Rebuild {id: event}, the last sequence number and the snapshot's from disk"""
+        events, seq = {}, 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            events = {event['id']: event for event in snapshot['events']}
+            seq = snapshot['seq']
+        snapshot_seq = seq
+        
+        if os.path.exists(self.path):
+            with open(self.path, 'r+b') as f:
+                complete = 0
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError("no line end")
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Only the last line can be torn, by a crash in the middle of an append;
+                        # cut it off so the next append starts on a fresh line
+                        logging.warning(f"Dropping an incomplete entry at the end of {self.path}")
+                        f.truncate(complete)
+                        break
+                    complete += len(line)
+                    if entry['seq'] <= seq:
+                        continue
+                    seq = entry['seq']
+                    if entry['op'] == 'remove':
+                        events.pop(entry['id'], None)
+                    elif entry['op'] == 'change':
+                        events[entry['id']] = dict(entry['event'],
+                                                   discovered_at=events[entry['id']].get('discovered_at'))
+                    else:
+                        events[entry['id']] = entry['event']
+        return events, seq, snapshot_seq
+    
+    def has_events(self):
+        return self.seq > 0
+    
+    def load(self):
+        """The events on the page at the last check, discovered_at being when each was added"""
+        with self.lock:
+            return [dict(event) for event in self.events.values()]
+    
+    def save(self, events):
+        """Append an entry for every added, changed and removed event, return how many"""
+        now = datetime.now().isoformat()
+        current = {event['id']: event for event in events}
+        with self.lock:
+            entries = []
+            for event_id, event in current.items():
+                known = self.events.get(event_id)
+                if known is None:
+                    entries.append({'op': 'add', 'id': event_id, 'event': event})
+                elif event_fields(known) != event_fields(event):
+                    entries.append({'op': 'change', 'id': event_id, 'event': event_fields(event)})
+            entries += [{'op': 'remove', 'id': event_id} for event_id in self.events if event_id not in current]
+            if not entries:
+                return 0
+            
+            lines = []
+            for entry in entries:
+                self.seq += 1
+                lines.append(json.dumps(dict(entry, seq=self.seq, at=now), ensure_ascii=False) + '\n')
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            
+            # The new state keeps the page order and each event's original discovery time
+            self.events = {event_id: dict(event, discovered_at=self.events[event_id].get('discovered_at'))
+                           if event_id in self.events else event
+                           for event_id, event in current.items()}
+            due = self.seq - self.snapshot_seq >= self.compact_every
+        
+        if due and not (self.compaction and self.compaction.is_alive()):
+            self.compaction = threading.Thread(target=self.compact, name='journal-compaction')
+            self.compaction.start()
+        return len(entries)
+    
+    def compact(self):
+        """Write a snapshot of the current state and drop the journal entries it covers"""
+        with self.lock:
+            events = list(self.events.values())
+            seq = self.seq
+        
+        # The slow part runs without the lock, saves keep appending meanwhile
+        temp_path = self.snapshot_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'seq': seq, 'events': events}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        
+        with self.lock:
+            # Entries appended after the snapshot was taken stay in the journal
+            with open(self.path, 'r', encoding='utf-8') as f:
+                tail = [line for line in f if line.strip() and json.loads(line)['seq'] > seq]
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.writelines(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self.snapshot_seq = seq
+        logging.info(f"Compacted {self.path} into a snapshot at seq {seq}, {len(tail)} entries left")
+    
+    def migrate_from_json(self, json_file):
+        """Import a JSON events file into an empty journal, once"""
+        if self.has_events() or not os.path.exists(json_file):
+            return 0
+        with open(json_file, 'r') as f:
+            events = json.load(f)
+        self.save(events)
+        logging.info(f"Migrated {len(events)} events from {json_file} to {self.path}")
+        return len(events)
+    
+    def record_check(self):
+        """The journal keeps no check times, a check that found the same events appends nothing"""
+    
+    def close(self):
+        """Wait for a running compaction to finish"""
+        if self.compaction:
+            self.compaction.join()
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that counts requests and new TCP connections to report keep-alive reuse"""
+    
+    def __init__(self, *args, **kwargs):
+        self.request_count = 0
+        self.connect_count = 0
+        super().__init__(*args, **kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        adapter = self
+        
+        # urllib3 reconnects a dropped keep-alive socket inside the same connection
+        # object, so count the actual connect() calls rather than pool objects
+        pool_classes = {}
+        for scheme, pool_cls in self.poolmanager.pool_classes_by_scheme.items():
+            class CountingConnection(pool_cls.ConnectionCls):
+                def connect(self):
+                    adapter.connect_count += 1
+                    super().connect()
+            pool_classes[scheme] = type(pool_cls.__name__, (pool_cls,), {'ConnectionCls': CountingConnection})
+        self.poolmanager.pool_classes_by_scheme = pool_classes
+    
+    def send(self, request, **kwargs):
+        self.request_count += 1
+        return super().send(request, **kwargs)
+
+
+# Keys of a "targets" entry that describe the page itself; every other key
+# overrides the top-level config for that page only
+TARGET_FIELDS = ('name', 'url', 'events_file', 'fetch_state_file')
+
+
+def target_name(url):
+    """Default name of a target, from its URL's host and path, safe to use in file names"""
+    parts = urlsplit(url)
+    location = parts.netloc + parts.path + (f"?{parts.query}" if parts.query else '')
+    return re.sub(r'[^A-Za-z0-9.]+', '-', location).strip('-')
+
+
 class OmSwamiEventTracker:
-    def __init__(self, config_file='config.json'):
-        """Initialize the event tracker with configuration"""
-        self.url = "https://omswami.org/events"
-        self.events_file = "events_data.json"
+    def __init__(self, config_file='config.json', target=None, config=None):
+        """Initialize the event tracker with configuration
+        
+        `target` and `config` are used to create the per-page trackers of a
+        multi-target configuration, see create_targets.
+        """
+        self.target = target
+        target = target or {}
+        self.name = target.get('name', 'omswami')
+        self.log_prefix = f"[{self.name}] " if self.target else ""
+        self.url = target.get('url', "https://omswami.org/events")
         self.config_file = config_file
-        self.config = self.load_config()
+        self.config = config if config is not None else self.load_config()
+        self.events_file = target.get('events_file', self.config.get('events_file', "events_data.json"))
+        # HTTP validators (ETag / Last-Modified) live next to the events file
+        self.fetch_state_file = target.get(
+            'fetch_state_file', os.path.join(os.path.dirname(self.events_file), "fetch_state.json"))
+        self.config = dict(self.config, **{key: value for key, value in target.items()
+                                           if key not in TARGET_FIELDS})
+        if self.config.get('base_url'):
+            # Fetch from a mirror or a local replay server instead of the live site
+            self.url = rebase_url(self.url, self.config['base_url'])
+        self.fetch_state = self.load_fetch_state()
+        self.pending_fetch_state = None
+        self.run_stats = self.new_run_stats()
+        self.stats_lock = threading.Lock()
+        self.metrics = None
+        self.session = self.create_session()
+        self.retry_policy = RetryPolicy(self.config.get('retry', {}))
+        breaker_config = self.config.get('circuit_breaker', {})
+        self.breaker = CircuitBreaker(failure_threshold=breaker_config.get('failure_threshold', 5),
+                                      reset_timeout=breaker_config.get('reset_timeout_seconds', 300))
+        self.parser_backend = self.select_parser_backend()
+        self.parse_scope = self.compile_parse_scope()
+        self.rules = self.compile_rules()
+        # Saved validators and fingerprints only stand for the same events under the same settings
+        self.parse_digest = hashlib.sha256(json.dumps(
+            [self.rules.digest, self.parser_backend, self.config.get('parse_scope')]).encode()).hexdigest()
+        self.parse_cache = self.create_parse_cache()
+        self.streaming = self.config.get('streaming', {}).get('enabled', False)
+        if self.streaming and lxml is None:
+            logging.warning("lxml is not installed, streaming parse disabled")
+            self.streaming = False
+        self.volatile_patterns = VOLATILE_PATTERNS + [
+            (re.compile(pattern.encode()), b'')
+            for pattern in self.config.get('fingerprint_ignore_patterns', [])
+        ]
+        state_dir = os.path.dirname(self.events_file)
+        self.details_cache_file = self.config.get('details', {}).get(
+            'cache_file', os.path.join(state_dir, f"details_cache_{self.name}.json" if self.target else
+                                       "details_cache.json"))
+        self.run_stats_file = self.config.get(
+            'run_stats_file', os.path.join(state_dir, f"run_stats_{self.name}.jsonl" if self.target else
+                                           "run_stats.jsonl"))
+        self.targets = self.create_targets() if not self.target else [self]
+        # A multi-target tracker only coordinates, each target has its own store
+        self.store = self.create_store() if self.targets == [self] else None
         
+    def create_targets(self):
+        """Create one tracker per page listed under "targets", or watch only the default page"""
+        targets = self.config.get('targets')
+        if not targets:
+            return [self]
+        
+        trackers = []
+        names = set()
+        for target in targets:
+            target = dict(target)
+            name = target.setdefault('name', target_name(target['url']))
+            if name in names:
+                raise ValueError(f"Two targets are named '{name}', give them different names")
+            names.add(name)
+            # Each page keeps its own state files
+            target.setdefault('events_file', f"events_{name}.json")
+            target.setdefault('fetch_state_file', f"fetch_state_{name}.json")
+            trackers.append(OmSwamiEventTracker(self.config_file, target=target, config=self.config))
+        logging.info(f"Watching {len(trackers)} target(s): {', '.join(t.name for t in trackers)}")
+        return trackers
+    
     def load_config(self):
         """Load email configuration from file or environment variables"""
         # Try to load from environment variables first (for cloud deployment)
@@ -83,117 +1375,287 @@ class OmSwamiEventTracker:
             logging.warning("Please update the config file with your email credentials!")
             return default_config
     
+    def select_parser_backend(self):
+        """Pick the parser backend from the config, falling back to what is installed"""
+        backend = self.config.get('parser', DEFAULT_PARSER)
+        if backend not in PARSER_BACKENDS:
+            logging.warning(f"Unknown parser '{backend}', expected one of {', '.join(PARSER_BACKENDS)}")
+            backend = DEFAULT_PARSER
+        if backend != 'html.parser' and lxml is None:
+            logging.warning(f"lxml is not installed, using html.parser instead of {backend}")
+            backend = 'html.parser'
+        return backend
+    
+    def create_store(self):
+        """Open the SQLite store or the journal if configured; None keeps events in the JSON events file"""
+        storage_config = self.config.get('storage', {})
+        backend = storage_config.get('backend', 'json')
+        if backend not in STORAGE_BACKENDS:
+            logging.warning(f"Unknown storage backend '{backend}', expected one of "
+                            f"{', '.join(STORAGE_BACKENDS)}; using json")
+            return None
+        if backend == 'json':
+            return None
+        
+        if backend == 'journal':
+            path = storage_config.get('path', 'events_journal.jsonl')
+            if self.target:
+                # Unlike the database, a journal holds a single target
+                root, ext = os.path.splitext(path)
+                path = f"{root}_{self.name}{ext}"
+            store = EventJournal(path,
+                                 compact_every=storage_config.get('compact_every', 1000))
+        else:
+            store = SqliteEventStore(storage_config.get('path', 'events.db'), self.name)
+        try:
+            store.migrate_from_json(self.events_file)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Could not migrate {self.events_file}: {e}")
+        return store
+    
+    def compile_rules(self):
+        """Compile the configured extraction rules, falling back to the defaults if they are invalid"""
+        try:
+            return ExtractionRules(self.config.get('extraction_rules'))
+        except (KeyError, TypeError, ValueError) as e:
+            logging.error(f"Invalid extraction_rules in config ({e}), using the default rules")
+            return ExtractionRules()
+    
+    def create_parse_cache(self):
+        """Create the optional on-disk parse result cache"""
+        cache_config = self.config.get('parse_cache', {})
+        if not cache_config.get('enabled', False):
+            return None
+        return ParseCache(cache_config.get('directory', '.parse_cache'),
+                          max_entries=cache_config.get('max_entries', 64),
+                          max_bytes=cache_config.get('max_bytes', 8 * 1024 * 1024))
+    
+    def compile_parse_scope(self):
+        """Compile the optional "parse_scope" container into (start tag, open/close tag) patterns"""
+        scope = self.config.get('parse_scope')
+        if not scope:
+            return None
+        tag = re.escape(scope['tag']).encode()
+        # One lookahead per attribute, so they match in any order
+        start = rb'<' + tag + rb'\b'
+        if scope.get('class'):
+            css_class = re.escape(scope['class']).encode()
+            start += rb'(?=[^>]*\sclass=["\'](?:[^"\']*\s)?' + css_class + rb'(?:\s[^"\']*)?["\'])'
+        if scope.get('id'):
+            start += rb'(?=[^>]*\sid=["\']' + re.escape(scope['id']).encode() + rb'["\'])'
+        return (re.compile(start + rb'[^>]*>', re.IGNORECASE),
+                re.compile(rb'<(/?)' + tag + rb'\b[^>]*?(/?)>', re.IGNORECASE))
+    
+    def restrict_to_scope(self, content):
+        """Cut the page down to the byte ranges of the configured event containers
+        
+        Everything outside them (navigation, scripts, gallery, footer) is never
+        handed to the parser. Returns the full page if no container matches.
+        """
+        start_pattern, tag_pattern = self.parse_scope
+        ranges = []
+        position = 0
+        while True:
+            start = start_pattern.search(content, position)
+            if not start:
+                break
+            
+            # Find the matching close tag by tracking nesting depth
+            depth = 1
+            end = len(content)
+            for tag in tag_pattern.finditer(content, start.end()):
+                if tag.group(1):
+                    depth -= 1
+                elif not tag.group(2):
+                    depth += 1
+                if depth == 0:
+                    end = tag.end()
+                    break
+            ranges.append(content[start.start():end])
+            position = end
+        
+        if not ranges:
+            logging.warning("Configured parse_scope not found on the page, parsing the whole page")
+            return content
+        return b'<html><body>' + b'\n'.join(ranges) + b'</body></html>'
+    
+    def create_session(self):
+        """Create the long-lived, connection-pooled HTTP session used for every check"""
+        http_config = self.config.get('http', {})
+        self.request_timeout = http_config.get('timeout', 30)
+        
+        session = requests.Session()
+        session.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        session.headers['Accept-Encoding'] = http_config.get('accept_encoding', ACCEPT_ENCODING)
+        
+        # Idle keep-alive connections are often closed by the server between checks;
+        # urllib3 notices that before reuse and reconnects. Every other failure, a
+        # connection dropped in flight included, is retried only by get_with_retries,
+        # so it gets backoff, Retry-After and the circuit breaker.
+        if 'max_retries' in http_config:
+            logging.warning("http.max_retries is no longer used, set retry.max_attempts instead")
+        adapter = PooledHTTPAdapter(
+            pool_connections=http_config.get('pool_connections', 1),
+            pool_maxsize=http_config.get('pool_maxsize', 4),
+            max_retries=Retry(total=0, read=False)
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def get_with_retries(self, headers):
+        """GET the events page, retrying transient failures with exponential backoff
+        
+        Connection errors, timeouts and the configured retry statuses are
+        retried; every failed attempt counts towards the circuit breaker.
+        Raises requests.RequestException once the attempts are used up.
+        """
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            try:
+                # Always streamed, decoded_chunks reads the body and counts its bytes
+                response = self.session.get(self.url, headers=headers, timeout=self.request_timeout,
+                                            stream=True)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                if response.status_code not in policy.retry_statuses:
+                    self.breaker.record_success()
+                    return response
+                error = requests.HTTPError(f"{response.status_code} {response.reason} for url: {self.url}",
+                                           response=response)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                response.close()
+            
+            self.breaker.record_failure()
+            if retry_after is not None and retry_after > policy.max_delay:
+                # The server wants a longer pause than we retry within, respect it
+                self.breaker.open_for(retry_after)
+                raise error
+            if attempt >= policy.max_attempts or not self.breaker.allow_request():
+                raise error
+            
+            delay = policy.delay(attempt, retry_after)
+            logging.warning(f"Fetch attempt {attempt} failed ({error}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+    
+    def log_connection_reuse(self):
+        """Log how many requests so far were served over an already open connection"""
+        adapter = self.session.get_adapter(self.url)
+        reused = max(adapter.request_count - adapter.connect_count, 0)
+        logging.info(f"HTTP connections: {adapter.connect_count} opened, "
+                     f"{reused} of {adapter.request_count} request(s) reused a pooled connection")
+    
+    def close(self):
+        """Release pooled connections and stop the metrics endpoint"""
+        self.session.close()
+        if self.store:
+            self.store.close()
+        for target in self.targets:
+            if target is not self:
+                target.close()
+        if self.metrics and not self.target:
+            self.metrics.close()
+    
+    def load_fetch_state(self):
+        """Load the HTTP validators stored by the last successful check"""
+        if os.path.exists(self.fetch_state_file):
+            try:
+                with open(self.fetch_state_file, 'r') as f:
+                    return json.load(f)
+            except json.JSONDecodeError:
+                logging.warning("Could not decode fetch state file, ignoring it")
+        return {}
+    
+    def save_fetch_state(self):
+        """Persist the validators of the response that was just processed"""
+        if not self.pending_fetch_state:
+            return
+        state = dict(self.fetch_state, **self.pending_fetch_state)
+        self.pending_fetch_state = None
+        if state == self.fetch_state and os.path.exists(self.fetch_state_file):
+            return
+        self.fetch_state = state
+        write_json_atomic(self.fetch_state_file, state)
+    
     def fetch_events(self):
-        """Fetch and parse events from the website"""
+        """Fetch and parse events from the website
+        
+        Returns None when the page is unchanged since the last check, either
+        because the server answered 304 or because the body hashes the same.
+        """
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(self.url, headers=headers, timeout=30)
-            response.raise_for_status()
+            headers = {}
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            events = []
+            # Only revalidate when we still have the events the validators belong to,
+            # extracted with the current rules, parser and scope
+            reusable = self.has_saved_events() and self.fetch_state.get('parse_digest') == self.parse_digest
+            if self.has_saved_events() and not reusable:
+                logging.info("Extraction settings changed since the last check, parsing the page again")
+            if reusable:
+                if self.fetch_state.get('etag'):
+                    headers['If-None-Match'] = self.fetch_state['etag']
+                if self.fetch_state.get('last_modified'):
+                    headers['If-Modified-Since'] = self.fetch_state['last_modified']
             
-            # Find all event cards - they contain h3 titles
-            event_sections = soup.find_all('h3')
+            if not self.breaker.allow_request():
+                logging.warning(f"Circuit breaker open, skipping fetch "
+                                f"(next probe in {self.breaker.seconds_until_probe():.0f}s)")
+                return []
             
-            for section in event_sections:
-                # Get the event title
-                title = section.get_text(strip=True)
-                
-                # Skip if it's not an event (like "Event Gallery" or "Download Pics")
-                if title in ["Event Gallery", "Download Pics"]:
-                    continue
-                
-                # Find the parent container to get more details
-                parent = section.find_parent()
+            with self.span('fetch'):
+                response = self.get_with_retries(headers)
+            self.log_connection_reuse()
+            self.run_stats['status'] = response.status_code
+            with response:
+                if response.status_code == 304:
+                    # Read the empty body so a streamed connection goes back to the pool
+                    response.content
+                    logging.info("Events page not modified since last check")
+                    return None
+                response.raise_for_status()
                 
-                # Try to find event dates - they appear after calendar icon
-                date_info = "Date not specified"
+                transfer = self.run_stats['page']
+                chunk_size = self.config.get('streaming', {}).get('chunk_size', 16384)
+                chunks = decoded_chunks(response, chunk_size, transfer)
                 
-                # Look for calendar icon after the title (h3)
-                calendar_icon = section.find_next('img', alt='Event Date')
+                # Remember the validators, they are saved once this check completes
+                self.pending_fetch_state = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'parse_digest': self.parse_digest
+                }
                 
-                if calendar_icon:
-                    logging.debug(f"Found calendar icon for event: {title}")
-                    
-                    # Try next_siblings first
-                    found = False
-                    sibling_count = 0
+                if self.streaming:
+                    # The body is parsed while it downloads, so there is nothing to hash up front;
+                    # the parse span includes the download
+                    events = []
+                    started = time.monotonic()
+                    with self.span('parse'):
+                        for event in self.stream_events(chunks, response_encoding(response)):
+                            if not events:
+                                logging.info(f"First event parsed after {(time.monotonic() - started) * 1000:.0f}ms")
+                            events.append(event)
+                else:
+                    with self.span('fetch'):
+                        content = b''.join(chunks)
+                    self.log_transfer(transfer)
                     
-                    for idx, sibling in enumerate(calendar_icon.next_siblings):
-                        sibling_count += 1
-                        if isinstance(sibling, (str, NavigableString)):
-                            # It's a text node
-                            date_text = str(sibling).strip()
-                            logging.debug(f"  Sibling {idx} (text): '{date_text[:50]}'")
-                            
-                            if date_text and len(date_text) > 3:  # Valid date text
-                                date_info = date_text
-                                logging.info(f"Found date for '{title}': {date_info}")
-                                found = True
-                                break
-                        else:
-                            # It's an element
-                            date_text = sibling.get_text(strip=True)
-                            logging.debug(f"  Sibling {idx} (element): '{date_text[:50]}'")
-                            
-                            if date_text and len(date_text) > 3 and not date_text.startswith('Event Details'):
-                                date_info = date_text
-                                logging.info(f"Found date for '{title}': {date_info}")
-                                found = True
-                                break
-                        
-                        if idx > 10:  # Safety limit
-                            break
+                    # Identical page content means identical events, skip the parse entirely
+                    fingerprint = self.fingerprint_content(content)
+                    self.pending_fetch_state['body_fingerprint'] = fingerprint
+                    if reusable and fingerprint == self.fetch_state.get('body_fingerprint'):
+                        logging.info("Events page content unchanged since last check")
+                        return None
                     
-                    # If no siblings found, try parent's siblings
-                    if not found and sibling_count == 0:
-                        logging.debug(f"  No next_siblings found, trying parent's siblings")
-                        parent_elem = calendar_icon.parent
-                        
-                        for idx, sibling in enumerate(parent_elem.next_siblings):
-                            if isinstance(sibling, (str, NavigableString)):
-                                date_text = str(sibling).strip()
-                                logging.debug(f"  Parent sibling {idx} (text): '{date_text[:50]}'")
-                                if date_text and len(date_text) > 3:
-                                    date_info = date_text
-                                    logging.info(f"Found date for '{title}': {date_info}")
-                                    break
-                            else:
-                                date_text = sibling.get_text(strip=True)
-                                logging.debug(f"  Parent sibling {idx} (element): '{date_text[:50]}'")
-                                if date_text and len(date_text) > 3:
-                                    date_info = date_text
-                                    logging.info(f"Found date for '{title}': {date_info}")
-                                    break
-                            
-                            if idx > 10:
-                                break
-                else:
-                    logging.warning(f"No calendar icon found for event: {title}")
-                
-                # Get event description (first few paragraphs)
-                description = ""
-                if parent:
-                    paragraphs = parent.find_all('p')[:2]  # Get first 2 paragraphs
-                    description = ' '.join([p.get_text(strip=True) for p in paragraphs])
-                
-                # Create event ID based on title
-                event_id = hashlib.md5(title.encode()).hexdigest()
-                
-                event = {
-                    'id': event_id,
-                    'title': title,
-                    'date': date_info,
-                    'description': description[:500] if description else 'No description available',
-                    'url': self.url,
-                    'discovered_at': datetime.now().isoformat()
-                }
-                
-                events.append(event)
+                    with self.span('parse'):
+                        events = self.parse_events_cached(content)
             
+            if self.streaming:
+                self.log_transfer(transfer)
             logging.info(f"Successfully fetched {len(events)} events")
             return events
             
@@ -204,21 +1666,463 @@ class OmSwamiEventTracker:
             logging.error(f"Unexpected error parsing events: {e}")
             return []
     
+    def new_run_stats(self):
+        """Start the stats record of one check"""
+        return {
+            'started_at': datetime.now().isoformat(),
+            'target': self.name,
+            'outcome': None,
+            'status': None,
+            'duration_ms': None,
+            'phases': {},
+            'page': {'content_encoding': None, 'wire_bytes': 0, 'decoded_bytes': 0},
+            'details': {'pages': 0, 'wire_bytes': 0, 'decoded_bytes': 0},
+            'events': {'fetched': 0, 'previous': 0, 'new': 0, 'modified': 0, 'removed': 0, 'reposted': 0},
+            'notification': None
+        }
+    
+    @contextlib.contextmanager
+    def span(self, phase):
+        """Add the time spent inside the block to a phase of the current check"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            phases = self.run_stats['phases']
+            phases[phase] = phases.get(phase, 0) + time.perf_counter() - started
+    
+    def finish_run_stats(self, started):
+        """Complete the run record: total duration and every phase in milliseconds
+        
+        "decode" (decompressing the body) is part of "fetch", and "dates" (date
+        extraction) part of "parse".
+        """
+        stats = self.run_stats
+        phases = stats['phases']
+        decode_seconds = stats['page'].pop('decode_seconds', 0)
+        if decode_seconds:
+            phases['decode'] = decode_seconds
+        stats['phases'] = {phase: round(phases[phase] * 1000, 2) for phase in RUN_PHASES if phase in phases}
+        stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return stats
+    
+    def save_run_stats(self):
+        """Append the record of the finished check to the run stats file"""
+        try:
+            with open(self.run_stats_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.run_stats, ensure_ascii=False) + '\n')
+        except Exception as e:
+            logging.error(f"Error saving run stats: {e}")
+    
+    def log_transfer(self, transfer):
+        """Log how much of the events page came over the wire and what it decoded to"""
+        saved = 1 - transfer['wire_bytes'] / transfer['decoded_bytes'] if transfer['decoded_bytes'] else 0
+        logging.info(f"Events page transfer: {format_bytes(transfer['wire_bytes'])} on the wire, "
+                     f"{format_bytes(transfer['decoded_bytes'])} decoded "
+                     f"({transfer['content_encoding']}, {saved:.0%} saved)")
+    
+    def fingerprint_content(self, content):
+        """Hash the page body with per-request tokens (nonces, cache-busters) removed"""
+        for pattern, replacement in self.volatile_patterns:
+            content = pattern.sub(replacement, content)
+        return hashlib.sha256(content).hexdigest()
+    
+    def stream_events(self, chunks, encoding='utf-8'):
+        """Parse events incrementally from an iterable of body chunks
+        
+        Each event is yielded as soon as its card is complete: its container has
+        closed with the date icon found, or the next title has started. With
+        streaming.stop_after set, reading stops once that container closes.
+        """
+        streaming_config = self.config.get('streaming', {})
+        stop_after = streaming_config.get('stop_after')
+        rules = self.rules
+        parser = lxml.etree.HTMLPullParser(events=('end',), encoding=encoding)
+        
+        queue = []      # cards not yet yielded, in document order
+        current = None  # the card that can still receive a date icon
+        occurrences = collections.Counter()
+        
+        def ready(card):
+            return card['closed'] and (card['icon'] is not None or card is not current)
+        
+        def emit():
+            while queue and (ready(queue[0]) or region_done):
+                card = queue.pop(0)
+                yield number_repeated_title(self.build_event(card['section'], card['title'], card['icon'], LxmlTree),
+                                            occurrences)
+                
+                # Drop the finished card from the tree so memory stays flat
+                parent = card['parent']
+                if card['closed'] and all(other['parent'] is not parent for other in queue):
+                    container = parent.getparent()
+                    parent.clear(keep_tail=True)
+                    while container is not None and parent.getprevious() is not None:
+                        del container[0]
+        
+        region_done = False
+        finished = False
+        chunks = iter(chunks)
+        while not (region_done or finished):
+            chunk = next(chunks, None)
+            if chunk is None:
+                parser.close()
+                finished = True
+            else:
+                parser.feed(chunk)
+            
+            for _, element in parser.read_events():
+                if element.tag == rules.title_tag:
+                    title = LxmlTree.text(element)
+                    current = None
+                    
+                    # Skip if it's not an event (like "Event Gallery" or "Download Pics")
+                    if title not in rules.skip_titles:
+                        current = {'section': element, 'title': title, 'icon': None,
+                                   'parent': element.getparent(), 'closed': False}
+                        queue.append(current)
+                    yield from emit()
+                elif element.tag == rules.icon_tag and rules.is_date_icon(LxmlTree, element):
+                    if current is not None and current['icon'] is None:
+                        current['icon'] = element
+                else:
+                    for card in queue:
+                        if card['parent'] is element:
+                            card['closed'] = True
+                    if stop_after and element_matches(element, stop_after):
+                        logging.debug(f"Events region closed, stop reading")
+                        region_done = True
+                        break
+                    yield from emit()
+        
+        # End of the page or of the events region, everything left is complete
+        region_done = True
+        current = None
+        yield from emit()
+    
+    def parse_events_cached(self, content):
+        """Parse events, reusing the result of an earlier parse of the same body if cached"""
+        if not self.parse_cache:
+            return self.parse_events(content)
+        
+        # Everything besides the body that shapes the result is part of the key
+        namespace = json.dumps([self.url, self.rules.digest, self.config.get('parse_scope')])
+        key = self.parse_cache.key(content, namespace)
+        events = self.parse_cache.get(key)
+        hit = events is not None
+        if hit:
+            discovered_at = datetime.now().isoformat()
+            occurrences = collections.Counter()
+            for event in events:
+                event['discovered_at'] = discovered_at
+                # Entries cached before repeated titles were numbered
+                number_repeated_title(event, occurrences)
+        else:
+            events = self.parse_events(content)
+            self.parse_cache.put(key, events)
+        
+        cache = self.parse_cache
+        logging.info(f"Parse cache {'hit' if hit else 'miss'} "
+                     f"(this run: {cache.hits} hits / {cache.misses} misses, "
+                     f"all runs: {cache.total_hits} hits / {cache.total_misses} misses)")
+        return events
+    
+    def parse_events(self, content):
+        """Parse events out of the events page HTML with the configured parser backend"""
+        if self.parse_scope:
+            content = self.restrict_to_scope(content)
+        
+        rules = self.rules
+        if self.parser_backend == 'lxml-native':
+            # iter() walks the tree once in document order; an XPath union of the
+            # two tags has to sort its result and gets quadratic on large pages
+            document = parse_lxml_document(content)
+            elements = document.iter(rules.title_tag, rules.icon_tag)
+            tree = LxmlTree
+        else:
+            soup = BeautifulSoup(content, self.parser_backend)
+            elements = soup.find_all([rules.title_tag, rules.icon_tag])
+            tree = SoupTree
+        
+        # Walk titles and calendar icons together in a single document-order pass.
+        # An event only gets a calendar icon that appears before the next title, so
+        # a card without an icon no longer steals the date of the following event.
+        cards = []
+        current = None
+        for element in elements:
+            if tree.tag(element) == rules.title_tag:
+                # Get the event title
+                title = tree.text(element)
+                
+                # Skip if it's not an event (like "Event Gallery" or "Download Pics")
+                if title in rules.skip_titles:
+                    current = None
+                    continue
+                
+                current = [element, title, None]
+                cards.append(current)
+            elif current and current[2] is None and rules.is_date_icon(tree, element):
+                current[2] = element
+        
+        occurrences = collections.Counter()
+        return [number_repeated_title(self.build_event(section, title, calendar_icon, tree), occurrences)
+                for section, title, calendar_icon in cards]
+    
+    def build_event(self, section, title, calendar_icon, tree=None):
+        """Build the event record for a title heading and its calendar icon"""
+        tree = tree or SoupTree
+        rules = self.rules
+        
+        # Find the parent container to get more details
+        parent = tree.parent(section)
+        
+        # Try to find event dates - they appear after calendar icon
+        if calendar_icon is not None:
+            logging.debug(f"Found calendar icon for event: {title}")
+            with self.span('dates'):
+                date_info = self.extract_date(title, calendar_icon, tree)
+        else:
+            logging.warning(f"No calendar icon found for event: {title}")
+            date_info = rules.default_date
+        
+        # Get event description (first few paragraphs)
+        description = ""
+        if parent is not None:
+            paragraphs = tree.descendants(parent, rules.description_tag, rules.max_paragraphs)
+            description = ' '.join([tree.text(p) for p in paragraphs])
+        
+        # The card's detail page link, followed when enrichment is enabled
+        details_url = None
+        if parent is not None:
+            for link in tree.descendants(parent, rules.details_link_tag, None):
+                href = tree.attr(link, 'href')
+                if href and tree.text(link).startswith(rules.details_link_text):
+                    details_url = urljoin(self.url, href)
+                    break
+        
+        # Create event ID based on title; the parse numbers repeated titles
+        event_id = hashlib.md5(title.encode()).hexdigest()
+        
+        return {
+            'id': event_id,
+            'title': title,
+            'date': date_info,
+            'description': description[:rules.max_description_length] if description else rules.default_description,
+            'url': self.url,
+            'details_url': details_url,
+            'discovered_at': datetime.now().isoformat()
+        }
+    
+    def extract_date(self, title, calendar_icon, tree=None):
+        """Read the event date from the text around the calendar icon, following the date rules"""
+        tree = tree or SoupTree
+        
+        for source in self.rules.date_sources:
+            if source.only_without_siblings and next(iter(tree.siblings(calendar_icon)), None) is not None:
+                continue
+            
+            if source.origin == 'icon_siblings':
+                start = calendar_icon
+            else:
+                logging.debug(f"  No date next to the icon, trying parent's siblings")
+                start = tree.parent(calendar_icon)
+            
+            for idx, sibling in enumerate(tree.siblings(start)):
+                if idx == source.max_siblings:  # Safety limit
+                    break
+                
+                if isinstance(sibling, str):
+                    # It's a text node
+                    date_text = sibling.strip()
+                    logging.debug(f"  {source.origin} {idx} (text): '{date_text[:50]}'")
+                    skipped = False
+                else:
+                    # It's an element
+                    date_text = tree.text(sibling)
+                    logging.debug(f"  {source.origin} {idx} (element): '{date_text[:50]}'")
+                    skipped = bool(source.skip_prefixes) and date_text.startswith(source.skip_prefixes)
+                
+                if len(date_text) >= source.min_length and not skipped:  # Valid date text
+                    logging.info(f"Found date for '{title}': {date_text}")
+                    return date_text
+        
+        return self.rules.default_date
+    
+    def parse_event_details(self, content):
+        """Extract the full description, venue and registration status from a detail page"""
+        rules = self.rules
+        if self.parser_backend == 'lxml-native':
+            root = parse_lxml_document(content)
+            tree = LxmlTree
+        else:
+            root = BeautifulSoup(content, self.parser_backend)
+            tree = SoupTree
+        
+        content_rules = rules.details_content
+        container = root
+        if content_rules.get('container'):
+            spec = content_rules['container']
+            container = next((element for element in tree.descendants(root, spec['tag'], None)
+                              if rules.matches(tree, element, spec)), root)
+        paragraphs = [tree.spaced_text(p) for p in tree.descendants(container, content_rules['tag'], None)]
+        description = '\n\n'.join(text for text in paragraphs if text)
+        
+        # "Venue: Ashram" in one element, or the label alone followed by the value
+        venue = None
+        blocks = [tree.spaced_text(element) for element in tree.iter_tags(root, VENUE_BLOCK_TAGS)]
+        for i, text in enumerate(blocks):
+            match = rules.venue_pattern.match(text) if len(text) <= 300 else None
+            if match:
+                venue = match.group(1).strip() or next(
+                    (following for following in blocks[i + 1:]
+                     if following and not rules.venue_pattern.match(following)), None)
+                if venue:
+                    break
+        
+        page_text = tree.spaced_text(root).lower()
+        registration = 'unknown'
+        for status, phrases in rules.registration_phrases:
+            if any(phrase in page_text for phrase in phrases):
+                registration = status
+                break
+        
+        return {
+            'full_description': description[:int(content_rules['max_length'])] or None,
+            'venue': venue,
+            'registration_status': registration
+        }
+    
+    def fetch_event_details(self, url, cached):
+        """Fetch and parse one detail page unless the cached copy is still good
+        
+        Returns the cache entry to keep and what happened: "cached" (fresh
+        enough, not requested), "not modified" (304), "unchanged" (same body,
+        not parsed again) or "parsed".
+        """
+        max_age = self.config.get('details', {}).get('max_age_minutes', 60) * 60
+        now = time.time()
+        if cached and now - cached['checked_at'] < max_age:
+            return cached, 'cached'
+        
+        headers = {}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        
+        with self.session.get(url, headers=headers, timeout=self.request_timeout, stream=True) as response:
+            if response.status_code == 304 and cached:
+                response.content
+                return dict(cached, checked_at=now), 'not modified'
+            response.raise_for_status()
+            transfer = {'wire_bytes': 0, 'decoded_bytes': 0}
+            content = b''.join(decoded_chunks(response, 16384, transfer))
+            self.record_detail_transfer(transfer)
+            validators = {'etag': response.headers.get('ETag'),
+                          'last_modified': response.headers.get('Last-Modified')}
+        
+        fingerprint = self.fingerprint_content(content)
+        if cached and cached['fingerprint'] == fingerprint:
+            return dict(cached, checked_at=now, **validators), 'unchanged'
+        
+        entry = dict(validators, fingerprint=fingerprint, checked_at=now, rules=self.rules.digest,
+                     details=self.parse_event_details(content))
+        return entry, 'parsed'
+    
+    def record_detail_transfer(self, transfer):
+        """Add one detail page download to the run stats, called from the worker threads"""
+        with self.stats_lock:
+            stats = self.run_stats['details']
+            stats['pages'] += 1
+            stats['wire_bytes'] += transfer['wire_bytes']
+            stats['decoded_bytes'] += transfer['decoded_bytes']
+    
+    def enrich_events(self, events):
+        """Add detail page fields to events, fetching the pages on a bounded worker pool"""
+        details_config = self.config.get('details', {})
+        cache = self.load_details_cache()
+        urls = sorted({event['details_url'] for event in events if event.get('details_url')})
+        
+        outcomes = collections.Counter()
+        entries = {}
+        with ThreadPoolExecutor(max_workers=details_config.get('max_workers', 4)) as pool:
+            futures = {url: pool.submit(self.fetch_event_details, url, cache.get(url)) for url in urls}
+            for url, future in futures.items():
+                try:
+                    entries[url], outcome = future.result()
+                except Exception as e:
+                    # One broken detail page must not fail the whole check
+                    logging.warning(f"Could not get event details from {url}: {e}")
+                    outcome = 'failed'
+                    if url in cache:
+                        entries[url] = cache[url]
+                outcomes[outcome] += 1
+        
+        for event in events:
+            entry = entries.get(event.get('details_url'))
+            if entry:
+                event.update(entry['details'])
+        
+        logging.info(f"Event details for {len(urls)} page(s): " +
+                     ', '.join(f"{outcomes[outcome]} {outcome}" for outcome in
+                               ('parsed', 'unchanged', 'not modified', 'cached', 'failed')))
+        # Only pages still linked from the listing stay in the cache
+        self.save_details_cache(entries)
+    
+    def load_details_cache(self):
+        """Load the cached detail pages, dropping entries extracted under other rules"""
+        if not os.path.exists(self.details_cache_file):
+            return {}
+        try:
+            with open(self.details_cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except Exception as e:
+            logging.error(f"Error loading event details cache: {e}")
+            return {}
+        return {url: entry for url, entry in cache.items() if entry.get('rules') == self.rules.digest}
+    
+    def save_details_cache(self, cache):
+        """Save the cached detail pages"""
+        try:
+            with open(self.details_cache_file, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            logging.error(f"Error saving event details cache: {e}")
+    
+    def has_saved_events(self):
+        """Whether an earlier check stored events to compare against"""
+        if self.store:
+            return self.store.has_events()
+        return os.path.exists(self.events_file)
+    
     def load_previous_events(self):
-        """Load previously stored events"""
+        """Load previously stored events, removed ones included with their removed_at"""
+        if self.store:
+            return self.store.load()
         if os.path.exists(self.events_file):
             try:
                 with open(self.events_file, 'r') as f:
-                    return json.load(f)
+                    events = json.load(f)
+                # Files saved before repeated titles were numbered hold them under one id
+                occurrences = collections.Counter()
+                return [number_repeated_title(event, occurrences) for event in events]
             except json.JSONDecodeError:
                 logging.warning("Could not decode events file, starting fresh")
                 return []
         return []
     
+    def record_unchanged_check(self):
+        """Note a check whose events equal the saved ones; the JSON file is left as it is"""
+        if self.store:
+            self.store.record_check()
+    
     def save_events(self, events):
-        """Save events to file"""
-        with open(self.events_file, 'w') as f:
-            json.dump(events, f, indent=2)
+        """Save events to file, or to the event store"""
+        if self.store:
+            written = self.store.save(events)
+            logging.info(f"Saved {len(events)} events to {self.store.path} ({written} change(s) written)")
+            return
+        write_json_atomic(self.events_file, events)
         logging.info(f"Saved {len(events)} events to {self.events_file}")
     
     def find_new_events(self, current_events, previous_events):
@@ -227,8 +2131,163 @@ class OmSwamiEventTracker:
         new_events = [event for event in current_events if event['id'] not in previous_ids]
         return new_events
     
-    def send_email_notification(self, new_events):
-        """Send email notification about new events"""
+    def diff_events(self, current_events, previous_events):
+        """Classify events as new, modified, unchanged or removed since the previous check
+        
+        Events are matched by id and compared by content fingerprint. Returns
+        a dict of lists; "modified" holds (previous, current) pairs.
+        """
+        previous_by_id = {event['id']: event for event in previous_events}
+        diff = {'new': [], 'modified': [], 'unchanged': [], 'reposted': [], 'removed': []}
+        current_ids = set()
+        for event in current_events:
+            current_ids.add(event['id'])
+            previous = previous_by_id.get(event['id'])
+            if previous is None:
+                diff['new'].append(event)
+            elif previous.get('removed_at'):
+                # Taken off the page and put back: already announced once
+                diff['reposted'].append(event)
+            elif event_fingerprint(previous) != event_fingerprint(event):
+                diff['modified'].append((previous, event))
+            else:
+                diff['unchanged'].append(event)
+        diff['removed'] = [event for event in previous_events
+                           if event['id'] not in current_ids and not event.get('removed_at')]
+        return diff
+    
+    def build_state(self, current_events, previous_events, removed_events):
+        """The events to save: those on the page, then tombstones of removed events oldest first
+        
+        Removed events are kept with their removed_at, so one that comes back
+        is not announced again, until the retention policy drops them.
+        """
+        now = datetime.now()
+        current_ids = {event['id'] for event in current_events}
+        tombstones = [event for event in previous_events
+                      if event.get('removed_at') and event['id'] not in current_ids]
+        tombstones += [dict(event, removed_at=now.isoformat()) for event in removed_events]
+        
+        retention = self.config.get('retention', {})
+        kept = prune_tombstones(tombstones, now, retention.get('max_age_days', 90),
+                                retention.get('max_entries', 1000))
+        if len(kept) < len(tombstones):
+            logging.info(f"Dropped {len(tombstones) - len(kept)} expired removed event(s)")
+        return current_events + kept
+    
+    def carry_forward_discovery(self, current_events, previous_events):
+        """Give events seen before the time they were first discovered instead of this fetch's"""
+        discovered = {event['id']: event.get('discovered_at') for event in previous_events}
+        for event in current_events:
+            if discovered.get(event['id']):
+                event['discovered_at'] = discovered[event['id']]
+    
+    def render_email(self, new_events, modified_events=()):
+        """Build the notification message for new events, without sender and recipients
+        
+        `modified_events` are (previous, current) pairs of events whose content
+        changed; they follow the new events, each with what it used to say.
+        """
+        # Create message
+        msg = MIMEMultipart('alternative')
+        if new_events:
+            msg['Subject'] = f"🔔 New Event(s) on Om Swami Ashram - {datetime.now().strftime('%Y-%m-%d')}"
+        else:
+            msg['Subject'] = f"🔔 Updated Event(s) on Om Swami Ashram - {datetime.now().strftime('%Y-%m-%d')}"
+        
+        # Create email body
+        if new_events:
+            text_parts = ["New events have been added to Om Swami Ashram website!\n\n"]
+            html_parts = ["""
+        <html>
+          <body style="font-family: Arial, sans-serif;">
+            <h2 style="color: #ff6b35;">🔔 New Events on Om Swami Ashram</h2>
+            <p>The following new event(s) have been discovered:</p>
+        """]
+        else:
+            text_parts = ["Events on Om Swami Ashram website have been updated!\n\n"]
+            html_parts = ["""
+        <html>
+          <body style="font-family: Arial, sans-serif;">
+            <h2 style="color: #ff6b35;">🔔 Updated Events on Om Swami Ashram</h2>
+            <p>The following event(s) have changed:</p>
+        """]
+        
+        for event, previous in [(event, None) for event in new_events] + \
+                [(current, previous) for previous, current in modified_events]:
+            changes = changed_fields(previous, event) if previous else []
+            
+            # Text version
+            text_parts.append(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
+            text_parts.append(f"{'Updated event' if previous else 'Event'}: {event['title']}\n")
+            text_parts.append(f"Date: {event['date']}\n")
+            text_parts.append(f"Description: {event['description']}\n")
+            if event.get('venue'):
+                text_parts.append(f"Venue: {event['venue']}\n")
+            if event.get('registration_status', 'unknown') != 'unknown':
+                text_parts.append(f"Registration: {event['registration_status']}\n")
+            for field, label in changes:
+                text_parts.append(f"{label} was: {previous.get(field) or '-'}\n")
+            text_parts.append(f"Link: {event.get('details_url') or event['url']}\n\n")
+            
+            # HTML version
+            html_parts.append(f"""
+            <div style="margin: 20px 0; padding: 15px; border-left: 4px solid #ff6b35; background-color: #f9f9f9;">
+                <h3 style="color: #333; margin-top: 0;">{'✏️ Updated: ' if previous else ''}{event['title']}</h3>
+                <p><strong>📅 Date:</strong> {event['date']}</p>
+                <p><strong>📝 Description:</strong> {event['description']}</p>
+                {f"<p><strong>📍 Venue:</strong> {event['venue']}</p>" if event.get('venue') else ''}
+                {f"<p><strong>🎟️ Registration:</strong> {event['registration_status']}</p>"
+                 if event.get('registration_status', 'unknown') != 'unknown' else ''}
+                {''.join(f"<p style='color: #999;'><strong>{label} was:</strong> {previous.get(field) or '-'}</p>"
+                         for field, label in changes)}
+                <p><a href="{event.get('details_url') or event['url']}" style="color: #ff6b35; text-decoration: none;">View Event Details →</a></p>
+            </div>
+            """)
+        
+        text_parts.append("\nVisit the events page: https://omswami.org/events")
+        text_parts.append("\n\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
+        text_parts.append("At the holy feet of the Great Guru, Om Swami,\n")
+        text_parts.append("I offer my obeisances with devotion.\n")
+        text_parts.append("Made with ❤️ by Radheshyam Om.\n")
+        
+        html_parts.append("""
+            <p style="margin-top: 30px;">
+                <a href="https://omswami.org/events" 
+                   style="display: inline-block; padding: 10px 20px; background-color: #ff6b35; 
+                          color: white; text-decoration: none; border-radius: 5px;">
+                    Visit Events Page
+                </a>
+            </p>
+            <hr style="margin-top: 30px; border: none; border-top: 1px solid #ddd;">
+            <div style="margin-top: 30px; padding: 20px; background: linear-gradient(135deg, #fff5f0 0%, #ffe8dd 100%); 
+                        border-left: 4px solid #ff6b35; border-radius: 5px; text-align: center;">
+                <p style="color: #8b4513; font-size: 14px; font-style: italic; margin: 0; line-height: 1.6;">
+                    At the holy feet of the Great Guru, Om Swami,<br>
+                    I offer my obeisances with devotion.
+                </p>
+                <p style="color: #666; font-size: 12px; margin-top: 10px;">
+                    Made with ❤️ by Radheshyam Om.
+                </p>
+            </div>
+            <p style="color: #999; font-size: 11px; margin-top: 20px; text-align: center;">
+                This is an automated notification from your Om Swami Events Tracker.
+            </p>
+          </body>
+        </html>
+        """)
+        
+        # Attach both versions
+        text_body = ''.join(text_parts)
+        html_body = ''.join(html_parts)
+        
+        msg.attach(MIMEText(text_body, 'plain'))
+        msg.attach(MIMEText(html_body, 'html'))
+        
+        return msg
+    
+    def send_email_notification(self, new_events, modified_events=()):
+        """Send email notification about new events, and about modified ones if given"""
         try:
             email_config = self.config['email']
             
@@ -243,78 +2302,10 @@ class OmSwamiEventTracker:
                 logging.error("No recipient emails configured!")
                 return False
             
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f"🔔 New Event(s) on Om Swami Ashram - {datetime.now().strftime('%Y-%m-%d')}"
+            msg = self.render_email(new_events, modified_events)
             msg['From'] = email_config['sender_email']
             msg['To'] = ', '.join(recipients)  # Join all recipients for display
             
-            # Create email body
-            text_parts = ["New events have been added to Om Swami Ashram website!\n\n"]
-            html_parts = ["""
-            <html>
-              <body style="font-family: Arial, sans-serif;">
-                <h2 style="color: #ff6b35;">🔔 New Events on Om Swami Ashram</h2>
-                <p>The following new event(s) have been discovered:</p>
-            """]
-            
-            for event in new_events:
-                # Text version
-                text_parts.append(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
-                text_parts.append(f"Event: {event['title']}\n")
-                text_parts.append(f"Date: {event['date']}\n")
-                text_parts.append(f"Description: {event['description']}\n")
-                text_parts.append(f"Link: {event['url']}\n\n")
-                
-                # HTML version
-                html_parts.append(f"""
-                <div style="margin: 20px 0; padding: 15px; border-left: 4px solid #ff6b35; background-color: #f9f9f9;">
-                    <h3 style="color: #333; margin-top: 0;">{event['title']}</h3>
-                    <p><strong>📅 Date:</strong> {event['date']}</p>
-                    <p><strong>📝 Description:</strong> {event['description']}</p>
-                    <p><a href="{event['url']}" style="color: #ff6b35; text-decoration: none;">View Event Details →</a></p>
-                </div>
-                """)
-            
-            text_parts.append("\nVisit the events page: https://omswami.org/events")
-            text_parts.append("\n\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
-            text_parts.append("At the holy feet of the Great Guru, Om Swami,\n")
-            text_parts.append("I offer my obeisances with devotion.\n")
-            text_parts.append("Made with ❤️ by Radheshyam Om.\n")
-            
-            html_parts.append("""
-                <p style="margin-top: 30px;">
-                    <a href="https://omswami.org/events" 
-                       style="display: inline-block; padding: 10px 20px; background-color: #ff6b35; 
-                              color: white; text-decoration: none; border-radius: 5px;">
-                        Visit Events Page
-                    </a>
-                </p>
-                <hr style="margin-top: 30px; border: none; border-top: 1px solid #ddd;">
-                <div style="margin-top: 30px; padding: 20px; background: linear-gradient(135deg, #fff5f0 0%, #ffe8dd 100%); 
-                            border-left: 4px solid #ff6b35; border-radius: 5px; text-align: center;">
-                    <p style="color: #8b4513; font-size: 14px; font-style: italic; margin: 0; line-height: 1.6;">
-                        At the holy feet of the Great Guru, Om Swami,<br>
-                        I offer my obeisances with devotion.
-                    </p>
-                    <p style="color: #666; font-size: 12px; margin-top: 10px;">
-                        Made with ❤️ by Radheshyam Om.
-                    </p>
-                </div>
-                <p style="color: #999; font-size: 11px; margin-top: 20px; text-align: center;">
-                    This is an automated notification from your Om Swami Events Tracker.
-                </p>
-              </body>
-            </html>
-            """)
-            
-            # Attach both versions
-            text_body = ''.join(text_parts)
-            html_body = ''.join(html_parts)
-            
-            msg.attach(MIMEText(text_body, 'plain'))
-            msg.attach(MIMEText(html_body, 'html'))
-            
             # Send email to all recipients
             with smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port']) as server:
                 server.starttls()
@@ -329,49 +2320,240 @@ class OmSwamiEventTracker:
             return False
     
     def check_for_new_events(self):
-        """Main method to check for new events"""
+        """Main method to check for new events
+        
+        Returns the list of new events, empty when nothing new was found.
+        """
+        self.run_stats = self.new_run_stats()
+        started = time.perf_counter()
+        try:
+            return self.run_check()
+        finally:
+            self.finish_run_stats(started)
+            logging.info(f"Run stats: {json.dumps(self.run_stats, ensure_ascii=False)}")
+            self.save_run_stats()
+            if self.metrics:
+                self.metrics.observe_run(self.run_stats)
+    
+    def run_check(self):
+        """Fetch the events page, notify about new events and save them"""
         logging.info("Checking for new events...")
+        stats = self.run_stats
+        
+        details_enabled = self.config.get('details', {}).get('enabled', False)
         
         # Fetch current events
         current_events = self.fetch_events()
-        if not current_events:
+        listing_unchanged = current_events is None
+        if listing_unchanged:
+            stats['outcome'] = 'not_modified' if stats['status'] == 304 else 'unchanged'
+            if not details_enabled:
+                logging.info("Events page unchanged, skipping this check")
+                # Keep the newest validators so the next request can get a 304
+                with self.span('persist'):
+                    self.record_unchanged_check()
+                    self.save_fetch_state()
+                return []
+            # Same listing, but venues and registration live on the detail pages
+            logging.info("Events page unchanged, revalidating the event details")
+            current_events = [dict(event) for event in self.load_previous_events() if not event.get('removed_at')]
+        elif not current_events:
             logging.warning("No events fetched, skipping this check")
-            return
+            stats['outcome'] = 'fetch_failed'
+            return []
+        else:
+            stats['events']['fetched'] = len(current_events)
         
-        # Load previous events
-        previous_events = self.load_previous_events()
+        if details_enabled:
+            with self.span('details'):
+                self.enrich_events(current_events)
         
-        # Find new events
-        new_events = self.find_new_events(current_events, previous_events)
+        with self.span('diff'):
+            # Load previous events
+            previous_events = self.load_previous_events()
+            
+            # Sort events into new, modified, unchanged and removed
+            diff = self.diff_events(current_events, previous_events)
+            new_events = diff['new']
+            
+            # With the old discovery times, an unchanged page equals the saved events
+            self.carry_forward_discovery(current_events, previous_events)
+            state = self.build_state(current_events, previous_events, diff['removed'])
+            # Compared by id: the stores load events in the order they were added, not page order
+            changed = ({event['id']: event for event in state} !=
+                       {event['id']: event for event in previous_events})
+        stats['events']['previous'] = sum(1 for event in previous_events if not event.get('removed_at'))
+        stats['events']['new'] = len(new_events)
+        stats['events']['modified'] = len(diff['modified'])
+        stats['events']['removed'] = len(diff['removed'])
+        stats['events']['reposted'] = len(diff['reposted'])
         
         if new_events:
             logging.info(f"Found {len(new_events)} new event(s)!")
             for event in new_events:
                 logging.info(f"  - {event['title']}")
-            
+        if diff['modified']:
+            logging.info(f"Found {len(diff['modified'])} modified event(s):")
+            for previous, event in diff['modified']:
+                fields = ', '.join(field for field, _ in changed_fields(previous, event)) or 'details'
+                logging.info(f"  - {event['title']} ({fields})")
+        for event in diff['removed']:
+            logging.info(f"Event no longer listed: {event['title']}")
+        for event in diff['reposted']:
+            logging.info(f"Event listed again, not announcing it: {event['title']}")
+        
+        modified_events = diff['modified'] if self.config.get('notify_on_modified', False) else []
+        if new_events or modified_events:
             # Send notification
-            self.send_email_notification(new_events)
-        else:
+            with self.span('notify'):
+                sent = self.send_email_notification(new_events, modified_events)
+            stats['notification'] = 'sent' if sent else 'failed'
+        
+        if new_events:
+            stats['outcome'] = 'new_events'
+        elif diff['modified']:
+            stats['outcome'] = 'modified_events'
+        elif not listing_unchanged:
             logging.info("No new events found")
+            stats['outcome'] = 'no_new_events'
         
         # Save current events for next comparison
-        self.save_events(current_events)
+        with self.span('persist'):
+            if changed:
+                self.save_events(state)
+            else:
+                logging.info("Events unchanged, nothing to save")
+                self.record_unchanged_check()
+            self.save_fetch_state()
+        return new_events
+    
+    def start_schedule(self):
+        """Set up the scheduler and optional adaptive interval for continuous checks"""
+        self.interval_minutes = self.config.get('check_interval_minutes', 60)
+        adaptive_config = self.config.get('adaptive_polling', {})
+        self.adaptive = None
+        
+        if adaptive_config.get('enabled', False):
+            if self.target and 'state_file' not in self.target.get('adaptive_polling', {}):
+                adaptive_config = dict(adaptive_config, state_file=os.path.join(
+                    os.path.dirname(self.events_file), f"polling_state_{self.name}.json"))
+            self.adaptive = AdaptiveInterval(adaptive_config, self.interval_minutes)
+            logging.info(f"{self.log_prefix}Starting continuous monitoring (adaptive interval between "
+                         f"{self.adaptive.min_minutes} and {self.adaptive.max_minutes} minutes)")
+        else:
+            logging.info(f"{self.log_prefix}Starting continuous monitoring "
+                         f"(checking every {self.interval_minutes} minutes)")
+        
+        scheduler_config = self.config.get('scheduler', {})
+        self.scheduler = CheckScheduler(jitter_seconds=scheduler_config.get('jitter_seconds', 0),
+                                        overrun_policy=scheduler_config.get('overrun_policy', 'skip'))
+    
+    def log_check_lag(self):
+        """Record when a scheduled check actually starts, log it if it is late"""
+        lag = self.scheduler.start_check()
+        if self.metrics:
+            target = (('target', self.name),)
+            self.metrics.set('event_tracker_scheduler_lag_seconds', target, lag)
+            self.metrics.set('event_tracker_scheduler_max_lag_seconds', target,
+                             self.scheduler.stats()['max_lag_seconds'])
+        if lag >= 1:
+            stats = self.scheduler.stats()
+            logging.info(f"{self.log_prefix}Check started {lag:.1f}s late "
+                         f"(max {stats['max_lag_seconds']:.1f}s, mean {stats['mean_lag_seconds']:.1f}s)")
+    
+    def schedule_next_check(self, new_events):
+        """Pick the next interval and return the seconds to wait until that check is due"""
+        if self.adaptive:
+            self.interval_minutes, reason = self.adaptive.next_interval(bool(new_events))
+            logging.info(f"{self.log_prefix}Next check in {self.interval_minutes:.1f} minutes ({reason})...")
+        else:
+            logging.info(f"{self.log_prefix}Next check in {self.interval_minutes} minutes...")
+        return self.scheduler.advance(self.interval_minutes * 60)
+    
+    def check_all_targets(self):
+        """Check every target once, concurrently when there is more than one"""
+        if self.targets == [self]:
+            return self.check_for_new_events()
+        return asyncio.run(self.check_targets_async())
     
     def run_continuous(self):
         """Run the tracker continuously with specified interval"""
-        interval_minutes = self.config.get('check_interval_minutes', 60)
-        interval_seconds = interval_minutes * 60
-        
-        logging.info(f"Starting continuous monitoring (checking every {interval_minutes} minutes)")
         logging.info("Press Ctrl+C to stop")
         
         try:
+            self.start_metrics()
+            if self.targets != [self]:
+                asyncio.run(self.run_targets_async())
+                return
+            
+            self.start_schedule()
             while True:
-                self.check_for_new_events()
-                logging.info(f"Next check in {interval_minutes} minutes...")
-                time.sleep(interval_seconds)
+                self.log_check_lag()
+                new_events = self.check_for_new_events()
+                time.sleep(self.schedule_next_check(new_events))
         except KeyboardInterrupt:
             logging.info("Tracker stopped by user")
+        finally:
+            self.close()
+    
+    def start_metrics(self):
+        """Start the optional Prometheus endpoint shared by every target"""
+        metrics_config = self.config.get('metrics', {})
+        if not metrics_config.get('enabled', False):
+            return
+        self.metrics = Metrics()
+        for target in self.targets:
+            target.metrics = self.metrics
+        try:
+            self.metrics.serve(metrics_config.get('host', '127.0.0.1'), metrics_config.get('port', 9108))
+        except OSError as e:
+            # Checks matter more than their metrics, keep running without the endpoint
+            logging.error(f"Could not start the metrics endpoint: {e}")
+    
+    def use_thread_pool(self):
+        """Give the running event loop a thread pool sized for the blocking checks"""
+        max_workers = self.config.get('max_workers', 32)
+        asyncio.get_event_loop().set_default_executor(ThreadPoolExecutor(max_workers=max_workers))
+    
+    def host_semaphores(self):
+        """Per-host semaphores bounding how many checks hit one server at a time"""
+        limit = self.config.get('max_concurrent_per_host', 2)
+        return collections.defaultdict(lambda: asyncio.Semaphore(limit))
+    
+    async def check_target(self, target, semaphores):
+        """Run one target's check on the thread pool under its host's concurrency limit"""
+        async with semaphores[urlsplit(target.url).netloc]:
+            started = time.monotonic()
+            loop = asyncio.get_event_loop()
+            try:
+                new_events = await loop.run_in_executor(None, target.check_for_new_events)
+            except Exception as e:
+                logging.error(f"{target.log_prefix}Check failed: {e}")
+                return []
+            logging.info(f"{target.log_prefix}Check finished in {time.monotonic() - started:.2f}s "
+                         f"with {len(new_events)} new event(s)")
+            return new_events
+    
+    async def check_targets_async(self):
+        """Check every target once, concurrently, returning their new events by name"""
+        self.use_thread_pool()
+        semaphores = self.host_semaphores()
+        results = await asyncio.gather(*(self.check_target(target, semaphores) for target in self.targets))
+        return {target.name: new_events for target, new_events in zip(self.targets, results)}
+    
+    async def run_target(self, target, semaphores):
+        """Check one target forever on its own schedule"""
+        target.start_schedule()
+        while True:
+            target.log_check_lag()
+            new_events = await self.check_target(target, semaphores)
+            await asyncio.sleep(target.schedule_next_check(new_events))
+    
+    async def run_targets_async(self):
+        """Run every target's schedule concurrently on one event loop"""
+        self.use_thread_pool()
+        semaphores = self.host_semaphores()
+        await asyncio.gather(*(self.run_target(target, semaphores) for target in self.targets))
 
 
 def main():
@@ -383,13 +2565,18 @@ def main():
                        help='Run once and exit (for cron jobs)')
     parser.add_argument('--config', default='config.json',
                        help='Path to config file (default: config.json)')
+    parser.add_argument('--base-url',
+                       help='Fetch from this server instead, e.g. a local replay_server.py (overrides base_url)')
     
     args = parser.parse_args()
     
     tracker = OmSwamiEventTracker(config_file=args.config)
+    if args.base_url:
+        for target in tracker.targets:
+            target.url = rebase_url(target.url, args.base_url)
     
     if args.once:
-        tracker.check_for_new_events()
+        tracker.check_all_targets()
     else:
         tracker.run_continuous()
 
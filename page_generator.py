@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Synthetic events pages for scale testing
+Generates pages in the site's markup with any number of event cards and the
+layout quirks the live page shows, together with the events they should yield
+"""
+
+import argparse
+import random
+
+MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July',
+          'August', 'September', 'October', 'November', 'December')
+KINDS = ('Sadhana Retreat', 'Satsang', 'Kirtan Evening', 'Meditation Camp', 'Guru Sadhana')
+PLACES = ('at the Ashram', 'Online', 'in Rishikesh', '– In Refuge of the Divine', '(Open Event)')
+NO_DATE = 'Date not specified'
+
+
+class SyntheticPage:
+    """A generated events page and the events a correct parse extracts from it
+
+    `events` holds one dict per card in page order with the `title`, the
+    `date` (NO_DATE for cards without a calendar icon), the `details_path`
+    the card links to and the `quirk` its date markup uses.
+    """
+
+    def __init__(self, html, events):
+        self.html = html
+        self.events = events
+
+
+def date_markup(quirk, date, details_path):
+    """Markup of a card's date line in one of the layouts seen on the live page"""
+    icon = '<img alt="Event Date" src="/img/icons/calendar.svg">'
+    if quirk == 'sibling_text':
+        # The date is plain text right after the icon
+        return f'<div class="event-meta">\n          {icon}\n          {date}\n        </div>'
+    if quirk == 'parent_siblings':
+        # The icon is wrapped alone, the date sits in the wrapper's next sibling
+        return (f'<div class="event-meta">\n          <span class="icon">{icon}</span>\n'
+                f'          <span class="dates">{date}</span>\n        </div>')
+    if quirk == 'noisy':
+        # A comment, an empty tag and the details link come between icon and date
+        return (f'<div class="event-meta">{icon}<!-- d --> <b></b>'
+                f'<a href="{details_path}">Event Details</a><strong>{date}</strong></div>')
+    return ''
+
+
+def generate_events_page(card_count, missing_icons=0.0, parent_sibling_dates=0.0, noisy_dates=0.0,
+                         gallery_headers=True, gallery_images=0, seed=0):
+    """Generate an events page with `card_count` event cards
+
+    The quirk fractions pick, per card, cards without a calendar icon (past
+    events on the live page), dates in the icon parent's siblings and dates
+    behind a comment and the details link; the remaining cards have the date
+    as text right after the icon. `gallery_headers` adds the "Event Gallery"
+    and "Download Pics" headings the tracker must not take for events, and
+    `gallery_images` adds navigation, scripts and an image gallery around the
+    events, the parts a scoped parse can leave out. The same arguments always
+    produce the same page.
+    """
+    if missing_icons + parent_sibling_dates + noisy_dates > 1:
+        raise ValueError("The quirk fractions add up to more than 1")
+
+    rng = random.Random(seed)
+    cards = []
+    events = []
+    for i in range(card_count):
+        title = f"{KINDS[i % len(KINDS)]} {i} {PLACES[rng.randrange(len(PLACES))]}"
+        start = rng.randrange(1, 29)
+        month = MONTHS[rng.randrange(12)]
+        date = rng.choice((f"{start} {month}", f"{start} – {start + rng.randrange(1, 10)} {month}",
+                           f"{start} {month} - {rng.randrange(1, 29)} {MONTHS[(MONTHS.index(month) + 1) % 12]}"))
+        details_path = f"/events/event-{i}"
+
+        roll = rng.random()
+        if roll < missing_icons:
+            quirk = 'missing_icon'
+        elif roll < missing_icons + parent_sibling_dates:
+            quirk = 'parent_siblings'
+        elif roll < missing_icons + parent_sibling_dates + noisy_dates:
+            quirk = 'noisy'
+        else:
+            quirk = 'sibling_text'
+
+        link = '' if quirk == 'noisy' else f'\n        <a class="btn" href="{details_path}">Event Details</a>'
+        cards.append(f"""
+      <div class="event-card{' past' if quirk == 'missing_icon' else ''}">
+        <img class="event-banner" src="/img/events/event-{i}.jpg" alt="Event {i}">
+        <h3>{title}</h3>
+        {date_markup(quirk, date, details_path)}
+        <p>Join us for {KINDS[i % len(KINDS)].lower()} number {i}.</p>
+        <p>Registrations open soon.</p>{link}
+      </div>""")
+        events.append({'title': title, 'date': NO_DATE if quirk == 'missing_icon' else date,
+                       'details_path': details_path, 'quirk': quirk})
+
+    chrome_top = chrome_bottom = ''
+    if gallery_images:
+        links = ''.join(f'<li><a href="/page-{i}">Page {i}</a></li>' for i in range(gallery_images // 4))
+        images = ''.join(f'<figure><img src="/gallery/{i}.jpg" alt=""><figcaption>Photo {i}</figcaption></figure>'
+                         for i in range(gallery_images))
+        script = 'var config = {' + ','.join(f'"k{i}": {i}' for i in range(gallery_images)) + '};'
+        chrome_top = f'<script>{script}</script><nav><ul>{links}</ul></nav>'
+        chrome_bottom = f'<section class="gallery">{images}</section><footer><ul>{links}</ul></footer>'
+    headers = '<h3>Event Gallery</h3>' if gallery_headers else ''
+    footer = '<h3>Download Pics</h3><p><a href="/downloads/pics.zip">Download all pictures</a></p>' \
+        if gallery_headers else ''
+
+    html = (f'<!DOCTYPE html>\n<html lang="en">\n<head><meta charset="utf-8"><title>Events | Om Swami</title>'
+            f'</head>\n<body>{chrome_top}\n<main>\n    <div class="events">' + ''.join(cards) +
+            f'\n    </div>\n    {headers}{chrome_bottom}{footer}\n</main>\n</body>\n</html>\n')
+    return SyntheticPage(html.encode(), events)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Generate a synthetic events page')
+    parser.add_argument('cards', type=int, help='Number of event cards (10 to 100000 and beyond)')
+    parser.add_argument('-o', '--output', default='synthetic_events.html',
+                        help='File to write (default: synthetic_events.html)')
+    parser.add_argument('--missing-icons', type=float, default=0.1,
+                        help='Fraction of cards without a calendar icon (default: 0.1)')
+    parser.add_argument('--parent-sibling-dates', type=float, default=0.2,
+                        help="Fraction of cards with the date in the icon parent's siblings (default: 0.2)")
+    parser.add_argument('--noisy-dates', type=float, default=0.1,
+                        help='Fraction of cards with a comment and link before the date (default: 0.1)')
+    parser.add_argument('--no-gallery-headers', action='store_true',
+                        help='Leave out the "Event Gallery" and "Download Pics" headings')
+    parser.add_argument('--gallery-images', type=int, default=0,
+                        help='Images in the gallery around the events (default: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args()
+
+    page = generate_events_page(args.cards, args.missing_icons, args.parent_sibling_dates, args.noisy_dates,
+                                not args.no_gallery_headers, args.gallery_images, args.seed)
+    with open(args.output, 'wb') as f:
+        f.write(page.html)
+    print(f"Wrote {args.cards} event cards ({len(page.html) / 1024:.0f} KB) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Record and replay events pages for offline testing and benchmarking
+`record` archives real responses into a recording directory, `serve` plays a
+recording back from a local http.server so the tracker can run against it
+"""
+
+import argparse
+import gzip
+import hashlib
+import http.server
+import json
+import logging
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+from event_tracker import OmSwamiEventTracker
+
+MANIFEST = 'manifest.json'
+
+# Response headers worth keeping in a recording; the body is stored decoded,
+# so the transfer headers (Content-Encoding, Content-Length, ...) are not
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control', 'Retry-After')
+
+
+class ReplayServer:
+    """Local HTTP server that answers every path from a script of steps
+
+    `routes` maps a path to its list of steps, each a dict with `status`,
+    optional `headers` and an optional `body` (bytes). Each request to a path
+    takes the next step; once the steps are used up the last one is repeated,
+    or with `after="loop"` the script starts over. A 200 step whose ETag the
+    client already has is answered with a 304, like a real server would, and
+    bodies are gzipped for clients that accept it unless `compress` is False.
+    """
+
+    def __init__(self, routes, host='127.0.0.1', port=0, after='last', compress=True):
+        if after not in ('last', 'loop'):
+            raise ValueError(f"Unknown after policy: {after}, expected 'last' or 'loop'")
+        self.routes = {path: list(steps) for path, steps in routes.items()}
+        self.after = after
+        self.compress = compress
+        self.positions = {path: 0 for path in self.routes}
+        self.requests = []  # (path, status) of every request served
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; with Nagle on, small
+            # responses wait for the client's delayed ACK (~40ms)
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                step = server.next_step(path)
+                status = step.get('status', 200)
+                headers = dict(step.get('headers', {}))
+                body = step.get('body', b'')
+
+                if status == 200 and headers.get('ETag') and self.headers.get('If-None-Match') == headers['ETag']:
+                    status, body = 304, b''
+                if status == 304:
+                    body = b''
+                if body and server.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    body = gzip.compress(body)
+                    headers['Content-Encoding'] = 'gzip'
+
+                with server.lock:
+                    server.requests.append((path, status))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug(f"Replay server: {format % args}")
+
+        self.httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.base_url = f"http://{host}:{self.httpd.server_port}"
+        self.thread = None
+
+    @classmethod
+    def from_recording(cls, directory, **kwargs):
+        """Create a server that plays back the manifest of a recording directory"""
+        return cls(load_recording(directory), **kwargs)
+
+    def next_step(self, path):
+        """Take the next scripted step for a path, 404 for paths without a script"""
+        with self.lock:
+            steps = self.routes.get(path)
+            if not steps:
+                return {'status': 404, 'body': b'not recorded'}
+            position = self.positions[path]
+            if position >= len(steps):
+                position = 0 if self.after == 'loop' else len(steps) - 1
+            self.positions[path] = position + 1
+            return steps[position]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def load_recording(directory):
+    """Read a recording's manifest into ReplayServer routes, loading the body files"""
+    with open(os.path.join(directory, MANIFEST), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    routes = {}
+    for path, steps in manifest['routes'].items():
+        routes[path] = []
+        for step in steps:
+            step = dict(step)
+            if step.get('body'):
+                with open(os.path.join(directory, step['body']), 'rb') as f:
+                    step['body'] = f.read()
+            routes[path].append(step)
+    return routes
+
+
+def record_response(session, url, directory, timeout=30):
+    """Fetch a URL and append the response as the next step of its path's script"""
+    manifest_file = os.path.join(directory, MANIFEST)
+    manifest = {'routes': {}}
+    if os.path.exists(manifest_file):
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    response = session.get(url, timeout=timeout)
+    path = urlsplit(url).path or '/'
+    steps = manifest['routes'].setdefault(path, [])
+    step = {'status': response.status_code,
+            'headers': {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers}}
+    if response.content:
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-') or 'index'
+        step['body'] = f"{slug}-{len(steps) + 1:03d}.html"
+        with open(os.path.join(directory, step['body']), 'wb') as f:
+            f.write(response.content)
+    step['sha256'] = hashlib.sha256(response.content).hexdigest()
+    steps.append(step)
+
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    logging.info(f"Recorded {url}: {response.status_code}, {len(response.content)} bytes as step {len(steps)}")
+    return response
+
+
+def record(tracker, directory, with_details=False):
+    """Record the tracker's events page, and optionally every event's detail page"""
+    os.makedirs(directory, exist_ok=True)
+    response = record_response(tracker.session, tracker.url, directory, tracker.request_timeout)
+    if with_details and response.ok:
+        for event in tracker.parse_events(response.content):
+            if event.get('details_url'):
+                record_response(tracker.session, event['details_url'], directory, tracker.request_timeout)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Record and replay events pages')
+    parser.add_argument('--config', default='config.json',
+                        help='Path to config file (default: config.json)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help='Append the live responses to a recording')
+    record_parser.add_argument('directory', help='Recording directory, created if missing')
+    record_parser.add_argument('--details', action='store_true', help="Record the events' detail pages too")
+
+    serve_parser = subparsers.add_parser('serve', help='Play a recording back on a local port')
+    serve_parser.add_argument('directory', help='Recording directory with a manifest.json')
+    serve_parser.add_argument('--port', type=int, default=8000, help='Port to listen on (default: 8000)')
+    serve_parser.add_argument('--loop', action='store_true',
+                              help='Start each script over when it is used up instead of repeating the last step')
+    serve_parser.add_argument('--no-compress', action='store_true', help='Never gzip response bodies')
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        tracker = OmSwamiEventTracker(config_file=args.config)
+        try:
+            record(tracker, args.directory, args.details)
+        finally:
+            tracker.close()
+    else:
+        server = ReplayServer.from_recording(args.directory, port=args.port,
+                                             after='loop' if args.loop else 'last',
+                                             compress=not args.no_compress)
+        logging.info(f"Replaying {args.directory} on {server.base_url}, "
+                     f"run the tracker with --base-url {server.base_url}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            logging.info("Replay server stopped by user")
+        finally:
+            server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
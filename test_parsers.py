@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Test script for the parser backends
+Parses the pages in fixtures/ with every backend, no internet needed
+"""
+
+import glob
+import os
+import tempfile
+import threading
+from unittest import mock
+
+import event_tracker
+from event_tracker import PARSER_BACKENDS, ParseCache
+from tracker_testing import make_tracker
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# A card whose paragraphs mix text with inline script, style and comments
+SCRIPTED_CARD = """<!DOCTYPE html>
+<html><body><div class="events">
+  <div class="event-card">
+    <h3>Kirtan Evening</h3>
+    <div class="event-meta"><img alt="Event Date" src="/img/icons/calendar.svg"> 7 – 8 June</div>
+    <p>First <script>var a = 1;</script>Second<style>p { color: red; }</style></p>
+    <p>Third<!-- hidden --> part</p>
+  </div>
+</div></body></html>
+""".encode()
+
+
+def parse_with_every_backend(content):
+    """The events each backend extracts from content, without the parse time"""
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for backend in PARSER_BACKENDS:
+            tracker = make_tracker(workdir, parser=backend)
+            assert tracker.parser_backend == backend, f"{backend} is not available"
+            results[backend] = [{key: value for key, value in event.items() if key != 'discovered_at'}
+                                for event in tracker.parse_events(content)]
+            tracker.close()
+    return results
+
+
+def test_backend_parity_on_fixtures():
+    """Every parser backend extracts identical events from the fixture pages"""
+    paths = sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')) +
+                   glob.glob(os.path.join(FIXTURES_DIR, 'replay', '*.html')))
+    assert paths
+    for path in paths:
+        with open(path, 'rb') as f:
+            results = parse_with_every_backend(f.read())
+        reference = results[PARSER_BACKENDS[0]]
+        assert reference, f"no events in {path}"
+        for backend, events in results.items():
+            assert events == reference, f"{backend} differs from {PARSER_BACKENDS[0]} on {path}"
+
+
+def test_script_and_style_text_is_ignored():
+    """Script, style and comment text never ends up in an event's description"""
+    results = parse_with_every_backend(SCRIPTED_CARD)
+    for backend, events in results.items():
+        assert [event['description'] for event in events] == ['FirstSecond Thirdpart'], (backend, events)
+
+
+def test_parse_scope_attribute_order():
+    """A parse_scope with class and id finds the container whatever order the attributes are in"""
+    with tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(workdir, parse_scope={"tag": "div", "class": "events", "id": "upcoming"})
+        for attributes in ('class="events" id="upcoming"', 'id="upcoming" class="wide events"',
+                           "data-x='1' id='upcoming' class='events'"):
+            page = f'<html><nav>Menu</nav><div {attributes}><p>Card</p></div><footer>End</footer></html>'.encode()
+            assert tracker.restrict_to_scope(page) == \
+                f'<html><body><div {attributes}><p>Card</p></div></body></html>'.encode(), attributes
+
+        # Both attributes have to match
+        page = b'<html><div id="upcoming" class="past"><p>Card</p></div></html>'
+        assert tracker.restrict_to_scope(page) == page
+        tracker.close()
+
+
+def cached_keys(cache):
+    """Keys of the entries on disk"""
+    return sorted(name[:-len('.json')] for name in os.listdir(cache.directory)
+                  if name.endswith('.json') and name != 'stats.json')
+
+
+def age_entries(cache, keys):
+    """Give the entries distinct mtimes in the order of keys, oldest first"""
+    for age, key in enumerate(reversed(keys), start=1):
+        path = os.path.join(cache.directory, key + '.json')
+        os.utime(path, (os.stat(path).st_atime, os.stat(path).st_mtime - 100 * age))
+
+
+def test_parse_cache_evicts_least_recently_used():
+    """The parse cache evicts its least recently used entries by count, a hit counting as a use"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ParseCache(directory, max_entries=3)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, [{'title': key}])
+        age_entries(cache, ['a', 'b', 'c'])
+
+        # Reading "a" makes "b" the least recently used entry
+        assert cache.get('a') == [{'title': 'a'}]
+        cache.put('d', [{'title': 'd'}])
+        assert cached_keys(cache) == ['a', 'c', 'd']
+
+        age_entries(cache, ['c', 'a', 'd'])
+        cache.put('e', [])
+        assert cached_keys(cache) == ['a', 'd', 'e']
+
+
+def test_parse_cache_evicts_by_size():
+    """The parse cache evicts the oldest entries until the total size fits max_bytes"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ParseCache(directory, max_entries=100, max_bytes=250)
+        for key in ('a', 'b'):
+            cache.put(key, [{'description': key * 90}])
+        age_entries(cache, ['a', 'b'])
+        assert cached_keys(cache) == ['a', 'b']
+
+        cache.put('c', [{'description': 'c' * 90}])
+        assert cached_keys(cache) == ['b', 'c']
+
+        # An entry too big for the cache on its own does not stay either
+        cache.put('d', [{'description': 'd' * 300}])
+        assert cached_keys(cache) == []
+
+
+def test_parse_cache_counters():
+    """Hits and misses are counted per run and in totals kept across runs"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ParseCache(directory)
+        key = cache.key(b'<html></html>', 'namespace')
+        assert key != cache.key(b'<html></html>', 'other namespace')
+        assert cache.get(key) is None
+        cache.put(key, [])
+        assert cache.get(key) == []
+        assert cache.get(key) == []
+        assert (cache.hits, cache.misses) == (2, 1)
+
+        reopened = ParseCache(directory)
+        assert (reopened.hits, reopened.misses) == (0, 0)
+        assert (reopened.total_hits, reopened.total_misses) == (2, 1)
+        reopened.get('missing')
+        assert (ParseCache(directory).total_hits, ParseCache(directory).total_misses) == (2, 2)
+
+
+def test_parse_cache_shared_directory():
+    """Caches sharing a directory from several threads add up their counts and survive each other's evictions"""
+    with tempfile.TemporaryDirectory() as directory:
+        caches = [ParseCache(directory, max_entries=2) for _ in range(4)]
+        caches[0].put('shared', [])
+
+        def use(cache, worker):
+            for i in range(25):
+                cache.get('shared')
+                cache.put(f"{worker}-{i}", [{'title': str(i)}])
+
+        threads = [threading.Thread(target=use, args=(cache, worker)) for worker, cache in enumerate(caches)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        reopened = ParseCache(directory)
+        assert reopened.total_hits + reopened.total_misses == 100
+        assert reopened.total_hits == sum(cache.hits for cache in caches)
+
+        # An entry another cache removed first, or a failed write, does not fail the caller
+        with mock.patch.object(event_tracker.os, 'remove', side_effect=FileNotFoundError):
+            reopened.put('late', [])
+        with mock.patch.object(event_tracker.os, 'replace', side_effect=PermissionError):
+            reopened.put('unwritable', [])
+        with mock.patch.object(event_tracker, 'write_json_atomic', side_effect=OSError):
+            assert reopened.get('late') == []
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("EVENT TRACKER - PARSER BACKEND TEST")
+    print("="*80 + "\n")
+
+    tests = [test_backend_parity_on_fixtures, test_script_and_style_text_is_ignored, test_parse_scope_attribute_order,
+             test_parse_cache_evicts_least_recently_used, test_parse_cache_evicts_by_size, test_parse_cache_counters,
+             test_parse_cache_shared_directory]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}\n  {e}")
+
+    print("\n" + "="*80)
+    if failed:
+        print(f"✗✗✗ {failed} TEST(S) FAILED")
+    else:
+        print("✓✓✓ ALL TESTS PASSED")
+    print("="*80 + "\n")
+
+    exit(1 if failed else 0)
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Test script for the full check pipeline against the local replay server
+Plays back fixtures/replay (page v1, v2, 304, 500), no internet needed
+"""
+
+import collections
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+from replay_server import ReplayServer, load_recording, record_response
+from tracker_testing import make_tracker as make_tracker_in
+
+RECORDING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'replay')
+
+
+def make_tracker(server, workdir, **config):
+    """Create a tracker pointed at the replay server through base_url, with fast retries"""
+    return make_tracker_in(workdir, **dict({
+        "base_url": server.base_url,
+        "retry": {"max_attempts": 2, "base_delay_seconds": 0.01}
+    }, **config))
+
+
+def test_scripted_sequence():
+    """v1 then v2 finds the added event, the 304 and the 500 leave the saved events alone"""
+    with ReplayServer.from_recording(RECORDING_DIR) as server, tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(server, workdir)
+        assert tracker.url == server.base_url + '/events', tracker.url
+
+        first = tracker.check_for_new_events()
+        assert len(first) == 5, [event['title'] for event in first]
+
+        second = tracker.check_for_new_events()
+        assert [event['title'] for event in second] == ['The Return of Grace'], second
+
+        assert tracker.check_for_new_events() == []
+        assert tracker.run_stats['status'] == 304, tracker.run_stats
+
+        assert tracker.check_for_new_events() == []
+        assert len(tracker.load_previous_events()) == 6
+        tracker.close()
+
+        # One run record per check, appended in order
+        with open(tracker.run_stats_file) as f:
+            records = [json.loads(line) for line in f]
+        assert [record['outcome'] for record in records] == \
+            ['new_events', 'new_events', 'not_modified', 'fetch_failed'], records
+        assert records[1]['events'] == {'fetched': 6, 'previous': 5, 'new': 1, 'modified': 0, 'removed': 0,
+                                        'reposted': 0}, records[1]
+        assert {'fetch', 'parse', 'diff', 'persist'} <= set(records[1]['phases']), records[1]
+
+    statuses = [status for _, status in server.requests]
+    assert statuses == [200, 200, 304, 500, 500], statuses
+
+
+def test_etag_revalidation():
+    """A repeated 200 step answers a client that already has its ETag with a 304"""
+    routes = load_recording(RECORDING_DIR)
+    routes['/events'] = routes['/events'][1:2]
+    with ReplayServer(routes) as server, tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(server, workdir)
+        assert len(tracker.check_for_new_events()) == 6
+        assert tracker.check_for_new_events() == []
+        tracker.close()
+    assert [status for _, status in server.requests] == [200, 304], server.requests
+
+
+def test_rules_change_reparses():
+    """Changed extraction rules ignore the saved ETag and fingerprint, so the same page is parsed again"""
+    routes = load_recording(RECORDING_DIR)
+    routes['/events'] = routes['/events'][1:2]
+    with ReplayServer(routes) as server, tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(server, workdir)
+        assert len(tracker.check_for_new_events()) == 6
+        tracker.close()
+
+        skip = ["Event Gallery", "Download Pics", "The Return of Grace"]
+        tracker = make_tracker(server, workdir, extraction_rules={"title": {"skip": skip}})
+        assert tracker.check_for_new_events() == []
+        assert tracker.run_stats['status'] == 200, tracker.run_stats
+        assert tracker.run_stats['events']['removed'] == 1, tracker.run_stats
+        assert 'The Return of Grace' not in [event['title'] for event in tracker.load_previous_events()
+                                             if not event.get('removed_at')]
+
+        # Unchanged rules: the page is revalidated as usual
+        assert tracker.check_for_new_events() == []
+        assert tracker.run_stats['status'] == 304, tracker.run_stats
+        tracker.close()
+
+
+def test_unchanged_events_are_not_rewritten():
+    """A changed page with the same events leaves the events file and discovery times untouched"""
+    routes = load_recording(RECORDING_DIR)
+    step = dict(routes['/events'][1], headers={'Content-Type': 'text/html; charset=utf-8'})
+    # The comment changes the body fingerprint, so the page is parsed again
+    routes['/events'] = [step, dict(step, body=step['body'] + b'<!-- rebuilt -->')]
+    with ReplayServer(routes) as server, tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(server, workdir)
+        first = tracker.check_for_new_events()
+        mtime = os.stat(tracker.events_file).st_mtime_ns
+
+        time.sleep(0.01)
+        assert tracker.check_for_new_events() == []
+        assert tracker.run_stats['outcome'] == 'no_new_events', tracker.run_stats
+        assert os.stat(tracker.events_file).st_mtime_ns == mtime
+        assert [event['discovered_at'] for event in tracker.load_previous_events()] == \
+            [event['discovered_at'] for event in first]
+        tracker.close()
+
+
+def test_store_records_unchanged_checks():
+    """With the SQLite store an unchanged check saves no events but still moves last_seen up to it"""
+    routes = load_recording(RECORDING_DIR)
+    v1 = routes['/events'][0]['body']
+    card = (b'<div class="event-card"><h3>Guru Purnima</h3><div class="event-meta">'
+            b'<img alt="Event Date" src="/img/icons/calendar.svg"> 10 July</div></div>')
+    # The new event is listed first, the store keeps events in the order they were added
+    v2 = v1.replace(b'<section class="events-list">', b'<section class="events-list">' + card)
+    # The last step repeats, so the last check gets an identical body
+    routes['/events'] = listing_steps(v1, 1) + listing_steps(v2, 3)
+    with ReplayServer(routes) as server, tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(server, workdir, storage={"backend": "sqlite"})
+        saves = []
+        save = tracker.store.save
+        tracker.store.save = lambda events: saves.append(len(events)) or save(events)
+
+        last_seen = []
+        for _ in range(5):
+            tracker.check_for_new_events()
+            last_seen.append(tracker.store.history()[0]['last_seen'])
+            time.sleep(0.01)
+        assert tracker.run_stats['outcome'] == 'unchanged', tracker.run_stats
+        assert len(saves) == 2, saves
+        assert last_seen == sorted(set(last_seen)), last_seen
+        tracker.close()
+
+
+def test_modified_events():
+    """A changed date is reported as a modification, with the old value in the email"""
+    routes = load_recording(RECORDING_DIR)
+    step = dict(routes['/events'][1], headers={'Content-Type': 'text/html; charset=utf-8'})
+    rescheduled = step['body'].replace('14 – 16 February'.encode(), '21 – 23 February'.encode()) \
+        .replace(b'Three days of kirtan', b'Three  days\n of kirtan')
+    routes['/events'] = [step, dict(step, body=rescheduled)]
+    with ReplayServer(routes) as server, tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(server, workdir, notify_on_modified=True)
+        previous = tracker.check_for_new_events()
+        assert tracker.check_for_new_events() == []
+        tracker.close()
+
+        stats = tracker.run_stats
+        assert stats['outcome'] == 'modified_events', stats
+        assert stats['events']['new'] == 0 and stats['events']['modified'] == 1, stats['events']
+        # Notifying was attempted (and failed, the test config has no recipients)
+        assert stats['notification'] == 'failed', stats
+
+        current = tracker.load_previous_events()
+        diff = tracker.diff_events(current, previous)
+        assert [event['date'] for _, event in diff['modified']] == ['21 – 23 February'], diff['modified']
+        assert len(diff['unchanged']) == 5 and not diff['new'] and not diff['removed'], diff
+        text = tracker.render_email([], diff['modified']).get_payload()[0].get_payload(decode=True).decode()
+        assert 'Date was: 14 – 16 February' in text, text
+        assert 'Description was' not in text, text
+
+
+def test_repeated_titles():
+    """Two cards with the same title get their own ids, so an identical page shows no modification"""
+    routes = load_recording(RECORDING_DIR)
+    body = routes['/events'][1]['body'].replace(b'<h3>Guru Sadhana 2025</h3>',
+                                                 b'<h3>Sri Lalita Sahasranama Sadhana</h3>')
+    routes['/events'] = listing_steps(body, 3)
+    with ReplayServer(routes) as server, tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(server, workdir, notify_on_modified=True)
+        first = tracker.check_for_new_events()
+        assert len({event['id'] for event in first}) == 6, first
+        repeated = [event for event in first if event['title'] == 'Sri Lalita Sahasranama Sadhana']
+        assert repeated[1]['id'] == repeated[0]['id'] + '-2', repeated
+
+        assert tracker.check_for_new_events() == []
+        assert tracker.run_stats['outcome'] == 'no_new_events', tracker.run_stats
+        assert tracker.run_stats['notification'] is None, tracker.run_stats
+
+        # An events file from before the numbering has both cards under one id
+        with open(tracker.events_file) as f:
+            saved = json.load(f)
+        for event in saved:
+            event['id'] = event['id'].split('-')[0]
+        with open(tracker.events_file, 'w') as f:
+            json.dump(saved, f)
+        assert tracker.check_for_new_events() == []
+        assert tracker.run_stats['events']['modified'] == 0, tracker.run_stats
+        tracker.close()
+
+
+def test_reposted_event_is_not_announced():
+    """An event taken off the page is kept as a tombstone and not announced again when it returns"""
+    routes = load_recording(RECORDING_DIR)
+    v1, v2 = [dict(step, headers={'Content-Type': 'text/html; charset=utf-8'}) for step in routes['/events'][:2]]
+    routes['/events'] = [v2, v1, v2]
+    with ReplayServer(routes) as server, tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(server, workdir)
+        assert len(tracker.check_for_new_events()) == 6
+        assert tracker.check_for_new_events() == []
+        assert tracker.run_stats['events']['removed'] == 1, tracker.run_stats
+        saved = tracker.load_previous_events()
+        assert [event['title'] for event in saved if event.get('removed_at')] == ['The Return of Grace'], saved
+
+        assert tracker.check_for_new_events() == []
+        assert tracker.run_stats['events']['reposted'] == 1, tracker.run_stats
+        assert not any(event.get('removed_at') for event in tracker.load_previous_events())
+        tracker.close()
+
+    # Without retention the tombstone is dropped straight away and the event is new again
+    routes['/events'] = [v2, v1, v2]
+    with ReplayServer(routes) as server, tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(server, workdir, retention={"max_entries": 0})
+        tracker.check_for_new_events()
+        tracker.check_for_new_events()
+        assert [event['title'] for event in tracker.check_for_new_events()] == ['The Return of Grace']
+        tracker.close()
+
+
+def detail_page(venue, registration):
+    """A detail page in the site's layout"""
+    return (f'<html><body><article><p>Ten days of chanting and silence.</p><p>Venue: {venue}</p>'
+            f'<p>{registration}</p></article></body></html>').encode()
+
+
+def listing_steps(body, count):
+    """Events page steps without validators whose bodies differ only by a comment, so each is parsed"""
+    return [{'status': 200, 'headers': {'Content-Type': 'text/html; charset=utf-8'},
+             'body': body + f'<!-- build {i} -->'.encode()} for i in range(count)]
+
+
+def test_event_details():
+    """Detail pages are reused on a 304 or an identical body, skipped while fresh, and a broken one is survived"""
+    routes = load_recording(RECORDING_DIR)
+    routes['/events'] = listing_steps(routes['/events'][1]['body'], 4)
+    routes['/events/sharanama'] = [{'status': 200, 'headers': {'ETag': '"s1"'},
+                                    'body': detail_page('Sri Badrika Ashram', 'Registrations are open')}]
+    routes['/events/maha-rudra'] = [{'status': 200, 'body': detail_page('Online', 'Sold out')}]
+    # Answers 200 with nothing to parse
+    routes['/events/return-of-grace'] = [{'status': 200}]
+    with ReplayServer(routes) as server, tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(server, workdir, details={"enabled": True, "max_age_minutes": 0})
+        new_events = tracker.check_for_new_events()
+        assert len(new_events) == 6, new_events
+        events = {(event.get('details_url') or '').replace(server.base_url, ''): event for event in new_events}
+        assert events['/events/sharanama']['venue'] == 'Sri Badrika Ashram', events['/events/sharanama']
+        assert events['/events/sharanama']['registration_status'] == 'open'
+        assert events['/events/maha-rudra']['registration_status'] == 'closed', events['/events/maha-rudra']
+        assert 'venue' not in events['/events/return-of-grace']
+        assert tracker.run_stats['outcome'] == 'new_events', tracker.run_stats
+
+        with open(tracker.details_cache_file) as f:
+            cache = json.load(f)
+        assert sorted(cache) == [server.base_url + '/events/maha-rudra', server.base_url + '/events/sharanama']
+        sharanama, maha_rudra = (cache[server.base_url + path] for path in ('/events/sharanama', '/events/maha-rudra'))
+        assert tracker.fetch_event_details(server.base_url + '/events/sharanama', sharanama)[1] == 'not modified'
+        assert tracker.fetch_event_details(server.base_url + '/events/maha-rudra', maha_rudra)[1] == 'unchanged'
+
+        # A second check revalidates the cached pages and tries the broken one again
+        server.requests.clear()
+        assert tracker.check_for_new_events() == []
+        assert sorted(server.requests) == [('/events', 200), ('/events/maha-rudra', 200),
+                                           ('/events/return-of-grace', 200), ('/events/sharanama', 304)]
+        tracker.close()
+
+        # Fresh enough cached pages are not requested at all
+        tracker = make_tracker(server, workdir, details={"enabled": True, "max_age_minutes": 60})
+        server.requests.clear()
+        assert tracker.check_for_new_events() == []
+        assert sorted(server.requests) == [('/events', 200), ('/events/return-of-grace', 200)]
+        assert tracker.fetch_event_details(server.base_url + '/events/sharanama', sharanama)[1] == 'cached'
+        tracker.close()
+
+
+def test_details_revalidated_on_unchanged_listing():
+    """A 304 for the events page still revalidates the detail pages, so a closed registration is noticed"""
+    routes = load_recording(RECORDING_DIR)
+    routes['/events'] = routes['/events'][1:2]
+    routes['/events/sharanama'] = [{'status': 200, 'body': detail_page('Sri Badrika Ashram', 'Register now')},
+                                   {'status': 200, 'body': detail_page('Sri Badrika Ashram', 'Sold out')}]
+    with ReplayServer(routes) as server, tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(server, workdir, notify_on_modified=True,
+                               details={"enabled": True, "max_age_minutes": 0})
+        assert len(tracker.check_for_new_events()) == 6
+
+        assert tracker.check_for_new_events() == []
+        stats = tracker.run_stats
+        assert stats['status'] == 304 and stats['outcome'] == 'modified_events', stats
+        assert stats['events']['modified'] == 1 and stats['notification'] == 'failed', stats
+        saved = {event.get('details_url'): event for event in tracker.load_previous_events()}
+        assert saved[server.base_url + '/events/sharanama']['registration_status'] == 'closed'
+
+        # Nothing changed anywhere: the check stays a plain 304
+        assert tracker.check_for_new_events() == []
+        assert tracker.run_stats['outcome'] == 'not_modified', tracker.run_stats
+        tracker.close()
+
+
+def test_targets_on_one_host():
+    """Two pages on one host keep separate state, and checks per host are limited"""
+    routes = load_recording(RECORDING_DIR)
+    v1, v2 = routes['/events'][0], routes['/events'][1]
+    routes = {'/events': [v2], '/retreats': [v1]}
+    with ReplayServer(routes) as server, tempfile.TemporaryDirectory() as workdir:
+        port = server.httpd.server_port
+        urls = [f"http://127.0.0.1:{port}/events", f"http://127.0.0.1:{port}/retreats",
+                f"http://localhost:{port}/events"]
+        # No base_url, it would move the localhost target onto 127.0.0.1
+        tracker = make_tracker(server, workdir, base_url=None, max_concurrent_per_host=1,
+                               targets=[{"url": url} for url in urls])
+        names = [target.name for target in tracker.targets]
+        assert names == [f"127.0.0.1-{port}-events", f"127.0.0.1-{port}-retreats",
+                         f"localhost-{port}-events"], names
+
+        # Count the checks running at once, per host and overall
+        lock = threading.Lock()
+        running = collections.Counter()
+        peaks = collections.Counter()
+
+        def slowed(target, check):
+            host = target.url.split('/')[2].split(':')[0]
+
+            def run():
+                with lock:
+                    running[host] += 1
+                    peaks[host] = max(peaks[host], running[host])
+                    peaks['all'] = max(peaks['all'], sum(running.values()))
+                time.sleep(0.2)
+                try:
+                    return check()
+                finally:
+                    with lock:
+                        running[host] -= 1
+            return run
+
+        for target in tracker.targets:
+            target.check_for_new_events = slowed(target, target.check_for_new_events)
+
+        results = tracker.check_all_targets()
+        assert {name: len(events) for name, events in results.items()} == dict(zip(names, [6, 5, 6])), results
+        assert peaks == {'127.0.0.1': 1, 'localhost': 1, 'all': 2}, peaks
+
+        # Each page has its own events and validators, so nothing is new or removed
+        with open(os.path.join(workdir, f"events_{names[1]}.json")) as f:
+            assert len(json.load(f)) == 5
+        with open(os.path.join(workdir, f"fetch_state_{names[0]}.json")) as f, \
+                open(os.path.join(workdir, f"fetch_state_{names[1]}.json")) as g:
+            assert json.load(f)['etag'] == v2['headers']['ETag'] and json.load(g)['etag'] == v1['headers']['ETag']
+        assert tracker.check_all_targets() == dict(zip(names, [[], [], []]))
+        assert all(target.run_stats['status'] == 304 for target in tracker.targets)
+        tracker.close()
+
+        # Names must be unique
+        try:
+            make_tracker(server, workdir, targets=[{"url": urls[0]}, {"url": urls[0] + '/'}])
+        except ValueError as e:
+            assert 'named' in str(e)
+        else:
+            assert False, "duplicate target names were accepted"
+
+
+def test_record_then_replay():
+    """A recorded response plays back with the same body and validators"""
+    with ReplayServer.from_recording(RECORDING_DIR) as live, tempfile.TemporaryDirectory() as directory:
+        with requests.Session() as session:
+            original = record_response(session, live.base_url + '/events', directory)
+
+        with ReplayServer.from_recording(directory) as replay:
+            replayed = requests.get(replay.base_url + '/events')
+        assert replayed.content == original.content
+        assert replayed.headers['ETag'] == original.headers['ETag']
+
+
+def test_metrics_endpoint():
+    """The metrics endpoint reports fetch latency, statuses, events and notifications"""
+    with ReplayServer.from_recording(RECORDING_DIR) as server, tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(server, workdir, metrics={"enabled": True, "port": 0})
+        tracker.start_metrics()
+        try:
+            for _ in range(4):
+                tracker.check_for_new_events()
+            port = tracker.metrics.httpd.server_port
+            response = requests.get(f"http://127.0.0.1:{port}/metrics")
+        finally:
+            tracker.close()
+
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4'), response.headers
+    lines = set(response.text.splitlines())
+    for line in ('event_tracker_fetch_responses_total{target="omswami",status="200"} 2',
+                 'event_tracker_fetch_responses_total{target="omswami",status="304"} 1',
+                 'event_tracker_new_events_total{target="omswami"} 6',
+                 'event_tracker_events_seen{target="omswami"} 6',
+                 'event_tracker_notifications_total{target="omswami",result="failed"} 2',
+                 'event_tracker_checks_total{target="omswami",outcome="fetch_failed"} 1',
+                 'event_tracker_fetch_duration_seconds_count{target="omswami"} 4',
+                 '# TYPE event_tracker_fetch_duration_seconds histogram'):
+        assert line in lines, f"{line} missing from\n{response.text}"
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("EVENT TRACKER - OFFLINE REPLAY TEST")
+    print("="*80 + "\n")
+
+    tests = [test_scripted_sequence, test_etag_revalidation, test_rules_change_reparses,
+             test_unchanged_events_are_not_rewritten, test_store_records_unchanged_checks, test_modified_events,
+             test_repeated_titles, test_reposted_event_is_not_announced, test_event_details,
+             test_details_revalidated_on_unchanged_listing, test_targets_on_one_host, test_record_then_replay,
+             test_metrics_endpoint]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}\n  {e}")
+
+    print("\n" + "="*80)
+    if failed:
+        print(f"✗✗✗ {failed} TEST(S) FAILED")
+    else:
+        print("✓✓✓ ALL TESTS PASSED")
+    print("="*80 + "\n")
+
+    exit(1 if failed else 0)
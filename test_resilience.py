@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Test script for fetch retries, Retry-After handling and the circuit breaker
+Runs against a local stand-in server that injects failures, no internet needed
+"""
+
+import http.server
+import tempfile
+import threading
+import time
+
+from tracker_testing import make_tracker as make_tracker_in
+
+EVENTS_PAGE = b"""<html><body>
+<div class="event-card"><h3>Guru Sadhana</h3>
+<div><img alt="Event Date" src="cal.svg"> 1 - 5 May</div><p>Online sadhana.</p></div>
+</body></html>"""
+
+
+class FailureInjectingServer:
+    """Local HTTP server that answers from a script of (status, headers) steps
+
+    A status of None stalls: nothing is sent for a second, longer than the
+    tests' read timeout. Once the script is used up every request gets the
+    events page.
+    """
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = 0
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.requests += 1
+                status, headers = server.script.pop(0) if server.script else (200, {})
+                if status is None:
+                    time.sleep(1)
+                    return
+                body = EVENTS_PAGE if status == 200 else b'injected failure'
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self.url = self.base_url + '/events'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_tracker(server, workdir, retry=None, circuit_breaker=None, **config):
+    """Create a tracker pointed at the stand-in server, with fast retries"""
+    return make_tracker_in(
+        workdir, base_url=server.base_url,
+        retry=retry or {"max_attempts": 3, "base_delay_seconds": 0.01, "max_delay_seconds": 5},
+        circuit_breaker=circuit_breaker or {"failure_threshold": 5, "reset_timeout_seconds": 60}, **config)
+
+
+def test_retries_transient_failures():
+    """Two 503s followed by the page: the fetch succeeds on the third attempt"""
+    server = FailureInjectingServer([(503, {}), (503, {})])
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            events = make_tracker(server, workdir).fetch_events()
+        assert [event['title'] for event in events] == ['Guru Sadhana'], events
+        assert server.requests == 3, server.requests
+    finally:
+        server.stop()
+
+
+def test_honors_retry_after():
+    """A 429 with Retry-After: 1 delays the retry by at least a second"""
+    server = FailureInjectingServer([(429, {'Retry-After': '1'})])
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            start = time.monotonic()
+            events = make_tracker(server, workdir).fetch_events()
+            elapsed = time.monotonic() - start
+        assert len(events) == 1, events
+        assert elapsed >= 1, f"retried after {elapsed:.2f}s"
+    finally:
+        server.stop()
+
+
+def test_read_timeouts_are_retried_once_per_attempt():
+    """A stalled page costs one request per attempt, each counted by the breaker"""
+    server = FailureInjectingServer([(None, {})] * 3)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            tracker = make_tracker(server, workdir, http={"timeout": 0.2})
+            assert tracker.fetch_events() == []
+        assert server.requests == 3, server.requests
+        assert tracker.breaker.failures == 3, tracker.breaker.failures
+    finally:
+        server.stop()
+
+
+def test_long_retry_after_opens_breaker():
+    """A Retry-After longer than max_delay_seconds stops retrying and pauses fetching"""
+    server = FailureInjectingServer([(503, {'Retry-After': '120'})])
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            tracker = make_tracker(server, workdir)
+            assert tracker.fetch_events() == []
+            assert tracker.fetch_events() == []
+        assert server.requests == 1, server.requests
+        assert tracker.breaker.state == 'open'
+    finally:
+        server.stop()
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Repeated failures open the breaker; after the timeout a half-open probe closes it"""
+    server = FailureInjectingServer([(500, {})] * 4)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            tracker = make_tracker(server, workdir,
+                                   retry={"max_attempts": 2, "base_delay_seconds": 0.01},
+                                   circuit_breaker={"failure_threshold": 4, "reset_timeout_seconds": 0.5})
+
+            # 2 checks x 2 attempts reach the threshold of 4 failures
+            assert tracker.fetch_events() == []
+            assert tracker.fetch_events() == []
+            assert tracker.breaker.state == 'open'
+
+            # While open, checks do not reach the server at all
+            assert tracker.fetch_events() == []
+            assert server.requests == 4, server.requests
+
+            # After the reset timeout one probe goes through and succeeds
+            time.sleep(0.6)
+            events = tracker.fetch_events()
+        assert len(events) == 1, events
+        assert tracker.breaker.state == 'closed'
+        assert server.requests == 5, server.requests
+    finally:
+        server.stop()
+
+
+def test_failed_probe_reopens_breaker():
+    """A failing half-open probe opens the breaker again without further retries"""
+    server = FailureInjectingServer([(502, {})] * 3)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            tracker = make_tracker(server, workdir,
+                                   retry={"max_attempts": 3, "base_delay_seconds": 0.01},
+                                   circuit_breaker={"failure_threshold": 2, "reset_timeout_seconds": 0.3})
+            assert tracker.fetch_events() == []
+            assert server.requests == 2, server.requests
+
+            time.sleep(0.4)
+            assert tracker.fetch_events() == []
+        assert server.requests == 3, server.requests
+        assert tracker.breaker.state == 'open'
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("EVENT TRACKER - FETCH RESILIENCE TEST")
+    print("="*80 + "\n")
+
+    tests = [test_retries_transient_failures, test_honors_retry_after, test_read_timeouts_are_retried_once_per_attempt,
+             test_long_retry_after_opens_breaker, test_circuit_breaker_opens_and_recovers,
+             test_failed_probe_reopens_breaker]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}\n  {e}")
+
+    print("\n" + "="*80)
+    if failed:
+        print(f"✗✗✗ {failed} TEST(S) FAILED")
+    else:
+        print("✓✓✓ ALL TESTS PASSED")
+    print("="*80 + "\n")
+
+    exit(1 if failed else 0)
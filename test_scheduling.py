@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test script for the adaptive polling interval and the check scheduler
+Drives both with fixed times and a fake monotonic clock, no internet needed
+"""
+
+import os
+import tempfile
+from datetime import datetime
+from unittest import mock
+
+import event_tracker
+from event_tracker import AdaptiveInterval, CheckScheduler
+
+
+class FakeClock:
+    """Stands in for time.monotonic, moved forward by hand"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_interval(workdir, **config):
+    """An adaptive interval with its state file in workdir"""
+    config = dict({"min_interval_minutes": 2, "max_interval_minutes": 60, "backoff_factor": 2,
+                   "hot_hour_threshold": 2, "state_file": os.path.join(workdir, 'polling_state.json')}, **config)
+    return AdaptiveInterval(config, initial_minutes=5)
+
+
+def test_backoff_and_reset():
+    """Quiet checks back off up to the maximum, a change drops the interval to the minimum"""
+    with tempfile.TemporaryDirectory() as workdir:
+        adaptive = make_interval(workdir)
+        quiet = datetime(2026, 3, 2, 14, 0)
+        assert [adaptive.next_interval(False, quiet)[0] for _ in range(5)] == [10, 20, 40, 60, 60]
+
+        assert adaptive.next_interval(True, quiet) == (2, "change detected")
+        assert adaptive.next_interval(False, quiet) == (4, "quiet, backing off")
+
+        # The interval and the change counts survive a restart
+        reopened = make_interval(workdir)
+        assert reopened.interval_minutes == 4
+        assert reopened.change_hours[14] == 1
+
+
+def test_hot_hours():
+    """Hours with repeated changes are polled at the minimum, and a slow interval is cut short before one"""
+    with tempfile.TemporaryDirectory() as workdir:
+        adaptive = make_interval(workdir)
+        adaptive.next_interval(True, datetime(2026, 3, 2, 9, 10))
+        assert not adaptive.is_hot(9)
+        adaptive.next_interval(True, datetime(2026, 3, 3, 9, 50))
+        assert adaptive.is_hot(9)
+
+        for _ in range(5):
+            adaptive.next_interval(False, datetime(2026, 3, 3, 12, 0))
+        assert adaptive.interval_minutes == 60
+
+        assert adaptive.next_interval(False, datetime(2026, 3, 4, 9, 30)) == (2, "hot time of day")
+        # 20 minutes before the hot hour, the 60 minute interval would sleep through its start
+        assert adaptive.next_interval(False, datetime(2026, 3, 4, 8, 40)) == (20, "hot time of day starting")
+        # but never drops below the minimum
+        assert adaptive.next_interval(False, datetime(2026, 3, 4, 8, 59)) == (2, "hot time of day starting")
+        assert adaptive.minutes_until_hot(datetime(2026, 3, 4, 10, 0)) == 23 * 60
+
+
+def test_deadlines_and_lag():
+    """Deadlines advance from the previous deadline, and each check's lag is recorded"""
+    clock = FakeClock()
+    with mock.patch.object(event_tracker.time, 'monotonic', clock):
+        scheduler = CheckScheduler()
+        assert scheduler.start_check() == 0
+
+        # A 10 second check does not push the schedule back
+        clock.now += 10
+        assert scheduler.advance(60) == 50
+        assert scheduler.deadline == 1060
+
+        clock.now = 1063
+        assert scheduler.start_check() == 3
+        clock.now = 1070
+        assert scheduler.advance(60) == 50
+        clock.now = 1121
+        assert scheduler.start_check() == 1
+
+        stats = scheduler.stats()
+        assert stats['checks'] == 3 and stats['max_lag_seconds'] == 3 and stats['last_lag_seconds'] == 1
+        assert stats['mean_lag_seconds'] == 4 / 3
+        assert stats['skipped_checks'] == 0
+
+
+def test_overrun_policies():
+    """After an overrun "skip" waits for the next free slot, "catch_up" runs the missed checks at once"""
+    clock = FakeClock()
+    with mock.patch.object(event_tracker.time, 'monotonic', clock):
+        skipping, catching_up = CheckScheduler(overrun_policy='skip'), CheckScheduler(overrun_policy='catch_up')
+
+        # The check due at 1000 runs until 1150, past the slots at 1060 and 1120
+        clock.now = 1150
+        assert skipping.advance(60) == 30
+        assert skipping.deadline == 1180 and skipping.stats()['skipped_checks'] == 2
+
+        assert [catching_up.advance(60) for _ in range(3)] == [0, 0, 30]
+        assert catching_up.deadline == 1180 and catching_up.stats()['skipped_checks'] == 0
+
+        assert CheckScheduler(overrun_policy='later').overrun_policy == 'skip'
+
+
+def test_jitter_keeps_the_schedule():
+    """Jitter moves each wake-up within its bounds but not the deadlines"""
+    clock = FakeClock()
+    with mock.patch.object(event_tracker.time, 'monotonic', clock):
+        scheduler = CheckScheduler(jitter_seconds=5)
+        for slot in range(1, 20):
+            wait = scheduler.advance(60)
+            assert scheduler.deadline == 1000 + 60 * slot
+            assert abs(scheduler.target - scheduler.deadline) <= 5
+            assert wait == scheduler.target - clock.now
+            clock.now = scheduler.target
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("EVENT TRACKER - SCHEDULING TEST")
+    print("="*80 + "\n")
+
+    tests = [test_backoff_and_reset, test_hot_hours, test_deadlines_and_lag, test_overrun_policies,
+             test_jitter_keeps_the_schedule]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}\n  {e}")
+
+    print("\n" + "="*80)
+    if failed:
+        print(f"✗✗✗ {failed} TEST(S) FAILED")
+    else:
+        print("✓✓✓ ALL TESTS PASSED")
+    print("="*80 + "\n")
+
+    exit(1 if failed else 0)
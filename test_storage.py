@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test script for the event storage backends
+Works on temporary files only, no internet needed
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime
+
+from event_tracker import EventJournal, SqliteEventStore, prune_tombstones
+from tracker_testing import make_tracker
+
+
+def make_event(title, date='1 - 5 May', discovered_at='2026-01-01T00:00:00'):
+    """An event record shaped like the ones build_event returns"""
+    return {
+        'id': title.lower().replace(' ', '-'),
+        'title': title,
+        'date': date,
+        'description': f"About {title}.",
+        'url': 'https://omswami.org/events',
+        'discovered_at': discovered_at
+    }
+
+
+def test_sqlite_writes_only_changes():
+    """Saving the same events again writes no rows; a change writes only the changed rows"""
+    with tempfile.TemporaryDirectory() as workdir:
+        store = SqliteEventStore(os.path.join(workdir, 'events.db'), 'omswami')
+        events = [make_event(f"Retreat {i}") for i in range(100)]
+        assert store.save(events) == 100
+
+        # discovered_at is not part of an event's stored fields
+        again = [dict(event, discovered_at='2026-02-01T00:00:00') for event in events]
+        assert store.save(again) == 0
+
+        again[5]['date'] = '2 - 6 May'
+        again.append(make_event("Retreat 100"))
+        del again[0]
+        assert store.save(again) == 3
+
+        # The removed event comes back as a tombstone after the events on the page
+        loaded = store.load()
+        assert [event['id'] for event in loaded] == [event['id'] for event in again] + ['retreat-0']
+        assert loaded[4]['date'] == '2 - 6 May'
+        assert loaded[4]['discovered_at'] == '2026-01-01T00:00:00', loaded[4]
+        assert loaded[-1]['removed_at'] and not any('removed_at' in event for event in loaded[:-1])
+
+        history = {event['id']: event for event in store.history()}
+        assert len(history) == 101
+        assert not history['retreat-0']['present'] and history['retreat-0']['last_seen']
+        assert history['retreat-1']['present']
+
+        # Keeping the tombstone writes nothing, leaving it out deletes its row
+        assert store.save(loaded) == 0
+        assert store.save(again) == 1
+        assert len(store.history()) == 100
+        store.close()
+
+
+def test_sqlite_targets_are_separate():
+    """Two targets in one database only see their own events"""
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'events.db')
+        first, second = SqliteEventStore(path, 'first'), SqliteEventStore(path, 'second')
+        first.save([make_event("Satsang")])
+        assert not second.has_events()
+        second.save([make_event("Kirtan"), make_event("Satsang")])
+        assert [event['title'] for event in first.load()] == ['Satsang']
+        assert len(second.load()) == 2
+        first.close()
+        second.close()
+
+
+def test_sqlite_keeps_repeated_titles():
+    """Cards sharing a title are stored as separate rows and reload unchanged"""
+    page = b"""<html><body>
+      <div class="event-card"><h3>Guru Purnima</h3><p>Held at the ashram.</p></div>
+      <div class="event-card"><h3>Guru Purnima</h3><p>Held online.</p></div>
+      <div class="event-card"><h3>Kirtan</h3></div>
+    </body></html>"""
+    with tempfile.TemporaryDirectory() as workdir:
+        tracker = make_tracker(workdir, storage={"backend": "sqlite"})
+        events = tracker.parse_events(page)
+        assert len({event['id'] for event in events}) == 3, events
+        assert tracker.store.save(events) == 3
+
+        loaded = tracker.load_previous_events()
+        assert [event['description'] for event in loaded] == ['Held at the ashram.', 'Held online.', 'No description available']
+        diff = tracker.diff_events(tracker.parse_events(page), loaded)
+        assert len(diff['unchanged']) == 3 and not diff['new'] and not diff['modified'], diff
+        assert tracker.store.save(loaded) == 0
+        tracker.close()
+
+
+def test_migration_from_json():
+    """A tracker switched to sqlite imports the JSON events file once and keeps first-seen times"""
+    with tempfile.TemporaryDirectory() as workdir:
+        events = [make_event("Guru Sadhana", discovered_at='2025-12-24T10:00:00'), make_event("Satsang")]
+        with open(os.path.join(workdir, 'events_data.json'), 'w') as f:
+            json.dump(events, f)
+
+        tracker = make_tracker(workdir, storage={"backend": "sqlite"})
+        assert tracker.has_saved_events()
+        previous = tracker.load_previous_events()
+        assert [event['title'] for event in previous] == ['Guru Sadhana', 'Satsang']
+        assert previous[0]['discovered_at'] == '2025-12-24T10:00:00'
+
+        # Already migrated: changes to the JSON file are not imported again
+        with open(os.path.join(workdir, 'events_data.json'), 'w') as f:
+            json.dump([], f)
+        tracker.close()
+        tracker = make_tracker(workdir, storage={"backend": "sqlite"})
+        assert len(tracker.load_previous_events()) == 2
+        tracker.close()
+
+
+def test_journal_replay_and_compaction():
+    """The journal rebuilds the same state after compaction, a torn last line is ignored"""
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'events_journal.jsonl')
+        journal = EventJournal(path, compact_every=5)
+        events = [make_event(f"Retreat {i}") for i in range(3)]
+        assert journal.save(events) == 3
+        assert journal.save([dict(event, discovered_at='2026-02-01T00:00:00') for event in events]) == 0
+
+        events[1] = dict(events[1], date='2 - 6 May', discovered_at='2026-02-01T00:00:00')
+        events = events[1:] + [make_event("Satsang")]
+        assert journal.save(events) == 3
+        journal.close()
+
+        # Six entries since the empty snapshot: compacted, nothing left in the journal
+        assert os.path.exists(journal.snapshot_path)
+        with open(path) as f:
+            assert f.read() == ''
+
+        journal = EventJournal(path, compact_every=5)
+        assert journal.save(events[:2]) == 1
+        with open(path, 'a') as f:
+            f.write('{"seq": 8, "op": "rem')
+
+        reopened = EventJournal(path)
+        assert reopened.seq == 7
+        loaded = reopened.load()
+        assert [event['title'] for event in loaded] == ['Retreat 1', 'Retreat 2'], loaded
+        assert loaded[0]['date'] == '2 - 6 May'
+        assert loaded[0]['discovered_at'] == '2026-01-01T00:00:00', loaded[0]
+
+        # The torn line was cut off, the next entry is readable
+        assert reopened.save(loaded[:1]) == 1
+        assert [event['title'] for event in EventJournal(path).load()] == ['Retreat 1']
+
+
+def test_tombstone_retention():
+    """Removed events expire oldest first, by age and by count"""
+    tombstones = [dict(make_event(f"Retreat {day}"), removed_at=f"2026-03-{day:02d}T12:00:00")
+                  for day in range(1, 11)]
+    now = datetime(2026, 3, 11, 12, 0)
+    assert prune_tombstones(tombstones, now, 90, 1000) == tombstones
+    assert [event['title'] for event in prune_tombstones(tombstones, now, 3, 1000)] == \
+        ['Retreat 8', 'Retreat 9', 'Retreat 10']
+    assert [event['title'] for event in prune_tombstones(tombstones, now, 90, 2)] == ['Retreat 9', 'Retreat 10']
+    assert prune_tombstones(tombstones, now, 90, 0) == []
+
+
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("EVENT TRACKER - STORAGE TEST")
+    print("="*80 + "\n")
+
+    tests = [test_sqlite_writes_only_changes, test_sqlite_targets_are_separate, test_sqlite_keeps_repeated_titles,
+             test_migration_from_json, test_journal_replay_and_compaction, test_tombstone_retention]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}\n  {e}")
+
+    print("\n" + "="*80)
+    if failed:
+        print(f"✗✗✗ {failed} TEST(S) FAILED")
+    else:
+        print("✓✓✓ ALL TESTS PASSED")
+    print("="*80 + "\n")
+
+    exit(1 if failed else 0)
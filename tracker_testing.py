@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Shared helper for the offline tests
+Builds trackers whose config and state files all live in a scratch directory
+"""
+
+import json
+import os
+
+from event_tracker import OmSwamiEventTracker, target_name
+
+
+def make_tracker(workdir, **config):
+    """Create a tracker with its config and every state file in workdir
+
+    The paths are set in the config before the tracker is created, so
+    nothing is read from or written to the current directory, not even by
+    the migration a storage backend runs when it opens.
+    """
+    config = dict({"email": {}, "events_file": os.path.join(workdir, 'events_data.json')}, **config)
+    storage = config.get('storage', {})
+    for section, key, default in (
+            ('storage', 'path', 'events_journal.jsonl' if storage.get('backend') == 'journal' else 'events.db'),
+            ('parse_cache', 'directory', '.parse_cache'),
+            ('adaptive_polling', 'state_file', 'polling_state.json')):
+        if section in config:
+            config[section] = dict(config[section], **{key: os.path.join(workdir, config[section].get(key, default))})
+    if config.get('targets'):
+        targets = []
+        for target in config['targets']:
+            name = target.get('name', target_name(target['url']))
+            targets.append(dict({'events_file': os.path.join(workdir, f"events_{name}.json"),
+                                 'fetch_state_file': os.path.join(workdir, f"fetch_state_{name}.json")},
+                                **target))
+        config['targets'] = targets
+
+    config_file = os.path.join(workdir, 'config.json')
+    with open(config_file, 'w') as f:
+        json.dump(config, f)
+    return OmSwamiEventTracker(config_file=config_file)